@@ -12,6 +12,8 @@ import json
 import math
 from collections import deque
 
+import shard_knapsack
+
 BELT_LIMIT = 780
 MAX_BUILDINGS = 20
 MAX_SURPLUS_PCT = 5.0
@@ -151,48 +153,70 @@ def trace_module(target_item, target_rate, producers, all_steps, stop_at_stage1=
     return scaled_steps, raw_solid, raw_fluid
 
 
-def optimize_copies(steps, product, demand, solid_input_total):
-    """Find minimum N copies where buildings_per_copy <= MAX_BUILDINGS and belt <= 780.
+COPIES_SEARCH_MAX = 99    # fallback copy-count search bound (belt ignored)
 
-    Picks the minimum N (= maximum belt utilization) that satisfies both hard
-    constraints.  Surplus is reported but not used as a hard filter — it's a
-    design goal, not a blocker.
 
-    Returns (copies, buildings_per_copy, output_per_copy, surplus_pct).
+def copies_frontier(batch):
+    """Evaluate every copy count n = 1..COPIES_SEARCH_MAX for every Stage 2
+    module at once.
+
+    batch: [(steps, product, demand, solid_input_total)], one per module.
+    All modules' steps are flattened into one buildings_exact vector; each n
+    ceils that vector once and per-module building counts are slice sums, so
+    the whole (modules x steps x n) grid costs one pass per n.
+
+    Returns, per module, a list indexed n-1 of
+    {copies, buildings_per_copy, belt_load, output_per_copy, surplus_pct,
+     feasible} where feasible = buildings <= MAX_BUILDINGS and belt <= 780.
     """
-    product_step = next(s for s in steps if s["item"] == product)
-    output_per_bldg = product_step["outputs"][product] / product_step["buildings_exact"]
+    flat, spans, prod_idx = [], [], []
+    for steps, product, _, _ in batch:
+        start = len(flat)
+        flat.extend(s["buildings_exact"] for s in steps)
+        spans.append((start, len(flat)))
+        prod_idx.append(start + next(i for i, s in enumerate(steps)
+                                     if s["item"] == product))
+    frontiers = [[] for _ in batch]
+    for n in range(1, COPIES_SEARCH_MAX + 1):
+        ceils = [max(1, math.ceil(be / n - 0.02)) for be in flat]
+        for m, (steps, product, demand, solid) in enumerate(batch):
+            lo, hi = spans[m]
+            total_bldgs = sum(ceils[lo:hi])
+            p = prod_idx[m]
+            output_per_bldg = steps[p - lo]["outputs"][product] / flat[p]
+            out_per_copy = ceils[p] * output_per_bldg
+            demand_per_copy = demand / n
+            belt = solid / n
+            frontiers[m].append({
+                "copies": n,
+                "buildings_per_copy": total_bldgs,
+                "belt_load": belt,
+                "output_per_copy": out_per_copy,
+                "surplus_pct": (out_per_copy - demand_per_copy) / demand_per_copy * 100,
+                "feasible": total_bldgs <= MAX_BUILDINGS and belt <= BELT_LIMIT,
+            })
+    return frontiers
 
-    for n in range(1, MAX_BUILDINGS + 1):
-        total_bldgs = sum(
-            max(1, math.ceil(s["buildings_exact"] / n - 0.02))
-            for s in steps
-        )
-        if total_bldgs > MAX_BUILDINGS:
-            continue
 
-        belt = solid_input_total / n
-        if belt > BELT_LIMIT:
-            continue
+def pick_copies(frontier, demand):
+    """Minimum N copies where buildings_per_copy <= MAX_BUILDINGS and belt <= 780.
 
-        prod_bc = max(1, math.ceil(product_step["buildings_exact"] / n - 0.02))
-        out_per_copy = prod_bc * output_per_bldg
-        demand_per_copy = demand / n
-        surplus = (out_per_copy - demand_per_copy) / demand_per_copy * 100
+    Picks the minimum N (= maximum belt utilization) that satisfies both hard
+    constraints.  Surplus is reported but not used as a hard filter — it's a
+    design goal, not a blocker.
 
-        return (n, total_bldgs, out_per_copy, surplus)
+    Returns (copies, buildings_per_copy, output_per_copy, surplus_pct).
+    """
+    for f in frontier[:MAX_BUILDINGS]:
+        if f["feasible"]:
+            return (f["copies"], f["buildings_per_copy"], f["output_per_copy"],
+                    f["surplus_pct"])
 
     # Fallback: just satisfy buildings constraint, ignore belt
-    for n in range(1, 100):
-        total_bldgs = sum(
-            max(1, math.ceil(s["buildings_exact"] / n - 0.02))
-            for s in steps
-        )
-        if total_bldgs <= MAX_BUILDINGS:
-            prod_bc = max(1, math.ceil(product_step["buildings_exact"] / n - 0.02))
-            out_per_copy = prod_bc * output_per_bldg
-            surplus = (out_per_copy - demand / n) / (demand / n) * 100
-            return (n, total_bldgs, out_per_copy, surplus)
+    for f in frontier:
+        if f["buildings_per_copy"] <= MAX_BUILDINGS:
+            return (f["copies"], f["buildings_per_copy"], f["output_per_copy"],
+                    f["surplus_pct"])
 
     return (MAX_BUILDINGS, MAX_BUILDINGS, demand / MAX_BUILDINGS, 0)
 
@@ -215,6 +239,7 @@ def process_factory(fid, mod):
     # Classify manufacturer inputs into Stage 1 (direct) vs Stage 2 (modules)
     stage2_modules = []
     stage1_demand = {}  # product -> total demand across all factory copies
+    traced = []  # (product, demand, scaled steps, solid inputs) per module
 
     for inp_item, inp_rate in mfr["inputs"].items():
         total_demand = inp_rate * factory_copies
@@ -236,49 +261,61 @@ def process_factory(fid, mod):
                 if s1_item in STAGE1_PRODUCTS or s1_item in producers and producers[s1_item]["item"] in STAGE1_PRODUCTS:
                     stage1_demand[s1_item] = stage1_demand.get(s1_item, 0) + s1_rate
 
-            # Optimize copies
-            solid_input_total = sum(inputs_solid.values())
-            n, bldgs_per_copy, output_per_copy, surplus_pct = optimize_copies(
-                scaled_steps, inp_item, total_demand, solid_input_total,
-            )
+            traced.append((inp_item, total_demand, scaled_steps, inputs_solid))
 
-            # Build per-copy step data
-            final_steps = []
-            building_totals = {}
-            for step in scaled_steps:
-                bex = step["buildings_exact"] / n
-                bc = max(1, math.ceil(bex - 0.02))
-                final_steps.append({
-                    "recipe": step["recipe"],
-                    "item": step["item"],
-                    "building": step["building"],
-                    "power_mw": step["power_mw"],
-                    "shards_per_building": 0,
-                    "inputs": {k: round(v / n, 4) for k, v in step["inputs"].items()},
-                    "outputs": {k: round(v / n, 4) for k, v in step["outputs"].items()},
-                    "buildings_exact": round(bex, 4),
-                    "buildings_ceil": bc,
-                })
-                building_totals[step["building"]] = (
-                    building_totals.get(step["building"], 0) + bc
-                )
-
-            belt_load = round(sum(v / n for v in inputs_solid.values()), 1)
-
-            stage2_modules.append({
-                "name": f"{inp_item} Module",
-                "product": inp_item,
-                "demand": round(total_demand, 2),
-                "copies": n,
-                "buildings_per_copy": bldgs_per_copy,
-                "output_per_copy": round(output_per_copy, 2),
-                "total_output": round(output_per_copy * n, 2),
-                "surplus_pct": round(surplus_pct, 1),
-                "belt_load": belt_load,
-                "inputs": {k: round(v / n, 4) for k, v in inputs_solid.items()},
-                "steps": final_steps,
-                "building_totals": building_totals,
+    # Optimize copies: every module's full copy-count frontier in one batch
+    frontiers = copies_frontier([
+        (scaled_steps, inp_item, total_demand, sum(inputs_solid.values()))
+        for inp_item, total_demand, scaled_steps, inputs_solid in traced])
+
+    for (inp_item, total_demand, scaled_steps, inputs_solid), frontier in zip(traced, frontiers):
+        n, bldgs_per_copy, output_per_copy, surplus_pct = pick_copies(frontier, total_demand)
+
+        # Build per-copy step data
+        final_steps = []
+        building_totals = {}
+        for step in scaled_steps:
+            bex = step["buildings_exact"] / n
+            bc = max(1, math.ceil(bex - 0.02))
+            final_steps.append({
+                "recipe": step["recipe"],
+                "item": step["item"],
+                "building": step["building"],
+                "power_mw": step["power_mw"],
+                "shards_per_building": 0,
+                "inputs": {k: round(v / n, 4) for k, v in step["inputs"].items()},
+                "outputs": {k: round(v / n, 4) for k, v in step["outputs"].items()},
+                "buildings_exact": round(bex, 4),
+                "buildings_ceil": bc,
             })
+            building_totals[step["building"]] = (
+                building_totals.get(step["building"], 0) + bc
+            )
+
+        belt_load = round(sum(v / n for v in inputs_solid.values()), 1)
+
+        stage2_modules.append({
+            "name": f"{inp_item} Module",
+            "product": inp_item,
+            "demand": round(total_demand, 2),
+            "copies": n,
+            "buildings_per_copy": bldgs_per_copy,
+            "output_per_copy": round(output_per_copy, 2),
+            "total_output": round(output_per_copy * n, 2),
+            "surplus_pct": round(surplus_pct, 1),
+            "belt_load": belt_load,
+            "inputs": {k: round(v / n, 4) for k, v in inputs_solid.items()},
+            "steps": final_steps,
+            "building_totals": building_totals,
+            # trade-offs for the detail view: every copy count up to the cap
+            "copies_frontier": [{
+                "copies": f["copies"],
+                "buildings_per_copy": f["buildings_per_copy"],
+                "belt_load": round(f["belt_load"], 1),
+                "surplus_pct": round(f["surplus_pct"], 1),
+                "feasible": f["feasible"],
+            } for f in frontier[:MAX_BUILDINGS]],
+        })
 
     # Build Stage 1
     stage1 = build_stage1(stage1_demand, producers, non_mfr_steps, mod)
@@ -436,10 +473,12 @@ def optimize_shards(factories, budget=SHARD_BUDGET):
     """Global shard optimization across all Stage 2 modules.
 
     For each step with fractional buildings, check if we can overclock
-    fewer buildings to save one building per copy. Allocate shards greedily
-    from a global budget, prioritizing larger buildings (more space saved).
+    fewer buildings to save one (or more) buildings per copy. Shards go to
+    the exact footprint-maximizing choice within the global budget
+    (shard_knapsack.solve); the old greedy pick, largest buildings first, is
+    computed alongside so its optimality gap can be reported.
     """
-    candidates = []
+    groups = []
 
     for fid, fac in factories.items():
         for mi, mm in enumerate(fac["stage2_modules"]):
@@ -454,43 +493,45 @@ def optimize_shards(factories, budget=SHARD_BUDGET):
                 if frac < 0.001 or frac > 0.999:
                     continue  # already effectively integer
 
-                new_count = bc - 1
-                new_clock = (be / new_count) * 100
-                if new_clock > 250:
-                    continue
-
-                shards_needed = shards_for_clock(new_clock)
-                if shards_needed is None or shards_needed == 0:
-                    continue
-
-                total_shards = shards_needed * new_count * copies
-
-                candidates.append({
-                    "fid": fid,
-                    "module_idx": mi,
-                    "step_idx": si,
-                    "building": step["building"],
-                    "item": step["item"],
-                    "old_count": bc,
-                    "new_count": new_count,
-                    "new_clock": round(new_clock, 1),
-                    "shards_per_building": shards_needed,
-                    "total_shards": total_shards,
-                    "copies": copies,
-                })
-
-    # Sort: largest buildings first (most space saved), then fewest total shards
-    candidates.sort(
-        key=lambda c: (-BUILDING_FOOTPRINT.get(c["building"], 0), c["total_shards"])
-    )
-
-    # Greedily allocate from budget
-    shards_used = 0
-    applied = []
-    for c in candidates:
-        if shards_used + c["total_shards"] <= budget:
-            shards_used += c["total_shards"]
-            applied.append(c)
+                options = []
+                for saved in range(1, shard_knapsack.MAX_SAVED + 1):
+                    new_count = bc - saved
+                    if new_count < 1:
+                        break
+                    new_clock = (be / new_count) * 100
+                    if new_clock > 250:
+                        break
+
+                    shards_needed = shards_for_clock(new_clock)
+                    if shards_needed is None or shards_needed == 0:
+                        continue
+
+                    total_shards = shards_needed * new_count * copies
+
+                    options.append({
+                        "fid": fid,
+                        "module_idx": mi,
+                        "step_idx": si,
+                        "building": step["building"],
+                        "item": step["item"],
+                        "old_count": bc,
+                        "new_count": new_count,
+                        "new_clock": round(new_clock, 1),
+                        "shards_per_building": shards_needed,
+                        "total_shards": total_shards,
+                        "copies": copies,
+                        "footprint_saved": (BUILDING_FOOTPRINT.get(step["building"], 0)
+                                            * saved * copies),
+                    })
+                if options:
+                    groups.append(options)
+
+    applied = shard_knapsack.solve(groups, budget)
+    greedy = shard_knapsack.greedy(
+        groups, budget,
+        key=lambda c: (-BUILDING_FOOTPRINT.get(c["building"], 0), c["total_shards"]))
+    shards_used = shard_knapsack.cost(applied)
+    print(shard_knapsack.gap_report("Stage 2 shard allocation", applied, greedy, budget))
 
     # Apply optimizations
     for opt in applied:
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+build_tiles.py — cut satisfactory-map.jpg into a zoom-level tile pyramid.
+
+Level z is the map scaled to TILE * 2**z pixels across (clamped to the
+source size at the top level), cut into TILE x TILE JPEG tiles:
+
+    map-tiles/<z>/<x>/<y>.jpg
+    map-tiles/tiles.json        {version, tile, width, height, levels}
+
+factory-map.html fetches tiles.json through server.py's /tiles/ route and
+draws only the tiles that intersect the viewport, at the coarsest level that
+still covers the screen at 1:1 — so first paint needs one 256px tile instead
+of the whole 2 MB image, and a pan only decodes the tiles scrolled into view.
+`version` is the source image's content hash; server.py serves tiles under
+/tiles/<version>/... as immutable, so a rebuild busts every cached tile.
+
+The pyramid is rebuilt only when the source changed (or with --force).
+
+JPEG decoding needs Pillow (optional: `pip install Pillow`). Without it this
+script exits with a note and the map keeps drawing the single full image.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import shutil
+import sys
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+SOURCE = 'satisfactory-map.jpg'
+OUT_DIR = 'map-tiles'
+MANIFEST = os.path.join(OUT_DIR, 'tiles.json')
+TILE = 256
+QUALITY = 85
+
+
+def source_version(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+def current_manifest():
+    try:
+        with open(MANIFEST) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def level_sizes(width, height):
+    """[(w, h)] per level, coarsest first; the last level is the source."""
+    top = max(0, math.ceil(math.log2(max(width, height) / TILE)))
+    sizes = []
+    for z in range(top + 1):
+        scale = 2 ** (z - top)
+        sizes.append((max(1, round(width * scale)), max(1, round(height * scale))))
+    return sizes
+
+
+def build(src, version):
+    resample = getattr(Image, 'Resampling', Image).LANCZOS
+    with Image.open(src) as im:
+        im = im.convert('RGB')
+        width, height = im.size
+        sizes = level_sizes(width, height)
+        if os.path.isdir(OUT_DIR):
+            shutil.rmtree(OUT_DIR)
+        n_tiles = 0
+        for z, (lw, lh) in enumerate(sizes):
+            level = im if (lw, lh) == im.size else im.resize((lw, lh), resample)
+            for tx in range(math.ceil(lw / TILE)):
+                col = os.path.join(OUT_DIR, str(z), str(tx))
+                os.makedirs(col)
+                for ty in range(math.ceil(lh / TILE)):
+                    box = (tx * TILE, ty * TILE,
+                           min((tx + 1) * TILE, lw), min((ty + 1) * TILE, lh))
+                    level.crop(box).save(os.path.join(col, f'{ty}.jpg'),
+                                         quality=QUALITY, optimize=True)
+                    n_tiles += 1
+            print(f"  level {z}: {lw}x{lh} px, "
+                  f"{math.ceil(lw / TILE)}x{math.ceil(lh / TILE)} tiles")
+    manifest = {'version': version, 'tile': TILE, 'width': width,
+                'height': height, 'levels': len(sizes)}
+    # written last: a half-built pyramid never has a manifest to advertise it
+    with open(MANIFEST, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest, n_tiles
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    ap.add_argument('--force', action='store_true',
+                    help='rebuild even if the source image is unchanged')
+    args = ap.parse_args()
+
+    version = source_version(SOURCE)
+    have = current_manifest()
+    if not args.force and have and have.get('version') == version:
+        print(f"{MANIFEST} is current (version {version}); nothing to do")
+        return
+    if Image is None:
+        sys.exit("Pillow is not installed (pip install Pillow); no tiles built "
+                 f"— factory-map.html falls back to {SOURCE}")
+    manifest, n_tiles = build(SOURCE, version)
+    print(f"Wrote {n_tiles} tiles in {manifest['levels']} levels to {OUT_DIR}/ "
+          f"(version {version})")
+
+
+if __name__ == '__main__':
+    main()
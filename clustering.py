@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+clustering.py — shared spatial single-linkage clustering for map nodes.
+
+Nodes are dicts with 'x'/'y' (game units). Two nodes are linked when
+math.hypot(dx, dy) <= radius; clusters are the connected components.
+Candidate pairs come from a uniform grid (cell = the radius, so only the
+3x3 neighbouring cells are compared) and components from union-find, so
+clustering is near-linear instead of all-pairs.
+
+Output order is stable: clusters by their first member's input position,
+members in input order.
+
+No external deps; stdlib only.
+"""
+import math
+from collections import defaultdict
+
+
+class UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, a):
+        parent = self.parent
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[ra] = rb
+
+
+def linked_pairs(nodes, radius):
+    """[(distance, i, j)] for every i < j within `radius`, grid-bucketed."""
+    cell = max(radius, 1.0)
+    grid = defaultdict(list)
+    for i, n in enumerate(nodes):
+        grid[(math.floor(n['x'] / cell), math.floor(n['y'] / cell))].append(i)
+    pairs = []
+    for (cx, cy), members in grid.items():
+        near = [j for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                for j in grid.get((cx + dx, cy + dy), ())]
+        for i in members:
+            xi, yi = nodes[i]['x'], nodes[i]['y']
+            for j in near:
+                if j <= i:
+                    continue
+                d = math.hypot(xi - nodes[j]['x'], yi - nodes[j]['y'])
+                if d <= radius:
+                    pairs.append((d, i, j))
+    return pairs
+
+
+def _components(nodes, uf):
+    groups = defaultdict(list)
+    for i, n in enumerate(nodes):
+        groups[uf.find(i)].append(n)
+    return list(groups.values())
+
+
+def single_linkage(nodes, radius):
+    """Single-linkage clusters of `nodes` at link distance `radius`."""
+    uf = UnionFind(len(nodes))
+    for _, i, j in linked_pairs(nodes, radius):
+        uf.union(i, j)
+    return _components(nodes, uf)
@@ -11,7 +11,8 @@ buildings_exact so the chain stays internally balanced.
 Run after find_gap_factory_locations.py. Reproducible / stdlib-only.
 """
 import json
-import sqlite3
+
+import recipe_graph
 
 DB = '/Users/deepak/AI/satisfy/satisfactory.db'
 SRC = '/Users/deepak/AI/satisfy/gap-factory-locations.json'
@@ -26,53 +27,21 @@ RES_TO_ORE = {
 }
 
 
-def fluid(item_name, qty):
-    """DB stores fluids as mL (x1000). Convert to m^3 for display."""
-    FLUIDS = {'Water', 'Crude Oil', 'Heavy Oil Residue', 'Fuel', 'Turbofuel',
-              'Liquid Biofuel', 'Alumina Solution', 'Sulfuric Acid',
-              'Nitric Acid', 'Nitrogen Gas', 'Dissolved Silica', 'Rocket Fuel',
-              'Ionized Fuel', 'Quantum Energy', 'Dark Matter Residue',
-              'Excited Photonic Matter'}
-    return qty / 1000.0 if item_name in FLUIDS else qty
-
-
-def recipe_io(db, recipe_name, want_item, want_building):
+def recipe_io(graph, recipe_name, want_item, want_building):
     """Return (duration, [(item, per_min_in)], [(item, per_min_out)]) for the
-    recipe row matching name (+ disambiguated by product item / building)."""
-    rows = db.execute("SELECT id, duration FROM recipes WHERE name = ?",
-                      (recipe_name,)).fetchall()
-    if not rows:
+    recipe row matching name (+ disambiguated by product item / building).
+    Rates come from the compiled graph (fluids already in m^3)."""
+    try:
+        r = graph.recipe_index(recipe_name, want_item, want_building)
+    except ValueError:
         raise SystemExit(f"recipe not found: {recipe_name!r}")
-    if len(rows) > 1:
-        # disambiguate: prefer the recipe that outputs want_item AND is built
-        # in want_building
-        best = None
-        for rid, dur in rows:
-            prods = [r['name'] for r in db.execute(
-                "SELECT i.name FROM recipe_products rp JOIN items i ON i.id=rp.item_id "
-                "WHERE rp.recipe_id=?", (rid,))]
-            blds = [r['name'] for r in db.execute(
-                "SELECT b.name FROM recipe_buildings rb JOIN buildings b ON b.id=rb.building_id "
-                "WHERE rb.recipe_id=?", (rid,))]
-            if want_item in prods and (not want_building or want_building in blds):
-                best = (rid, dur)
-                break
-        rows = [best] if best else rows[:1]
-    rid, dur = rows[0]
-    ins = [(r['name'], fluid(r['name'], r['quantity']) / dur * 60)
-           for r in db.execute(
-               "SELECT i.name, ri.quantity FROM recipe_ingredients ri "
-               "JOIN items i ON i.id=ri.item_id WHERE ri.recipe_id=?", (rid,))]
-    outs = [(r['name'], fluid(r['name'], r['quantity']) / dur * 60)
-            for r in db.execute(
-                "SELECT i.name, rp.quantity FROM recipe_products rp "
-                "JOIN items i ON i.id=rp.item_id WHERE rp.recipe_id=?", (rid,))]
-    return dur, ins, outs
+    ins = [(graph.item_name[i], q) for i, q in graph.inputs(r)]
+    outs = [(graph.item_name[i], q) for i, q in graph.outputs(r)]
+    return graph.recipe_duration[r], ins, outs
 
 
 def main():
-    db = sqlite3.connect(DB)
-    db.row_factory = sqlite3.Row
+    graph = recipe_graph.load(DB)
     src = json.load(open(SRC))
     fl = src['factory_locations']
     out = {'meta': {'description': 'Per-factory recipe/building/input/output '
@@ -88,7 +57,7 @@ def main():
         produced = {}   # item -> total per-min produced across all steps
         for c in f['building_chain']:
             m = c['buildings_exact']  # scale factor: per-building rate -> step rate
-            dur, ins, outs = recipe_io(db, c['recipe'], c['item'], c['building'])
+            dur, ins, outs = recipe_io(graph, c['recipe'], c['item'], c['building'])
             step_in = [{'item': it, 'per_min': round(r * m, 1)} for it, r in ins]
             step_out = [{'item': it, 'per_min': round(r * m, 1)} for it, r in outs]
             for it, r in ins:
@@ -162,7 +131,9 @@ def main():
             'net_per_item': net,
         }
 
-    json.dump(out, open(OUT, 'w'), indent=2)
+    # sites/outposts reference the source's columnar node table by id
+    out['node_table'] = src['node_table']
+    json.dump(out, open(OUT, 'w'), separators=(',', ':'))
     print(f"wrote {OUT}: {len(out['factories'])} factories")
     # quick console sanity: list any net negative non-raw items (would be an
     # unsupplied intermediate = chain imbalance)
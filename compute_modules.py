@@ -3,53 +3,23 @@
 Module = 1 HMF Manufacturer at 100% clock, with all upstream buildings.
 Supports shard-based overclock optimization to reduce building counts."""
 
-import sqlite3
 import json
 import math
 
-db = sqlite3.connect('/Users/deepak/AI/satisfy/satisfactory.db')
-db.row_factory = sqlite3.Row
+import recipe_graph
+import shard_knapsack
+
+graph = recipe_graph.load('/Users/deepak/AI/satisfy/satisfactory.db')
 
 def get_recipe_rates(recipe_name):
     """Get per-building-per-minute rates for a recipe."""
-    row = db.execute("SELECT id, duration FROM recipes WHERE name = ?", (recipe_name,)).fetchone()
-    if not row:
+    if recipe_name not in graph.recipes_named:
         raise ValueError(f"Recipe not found: {recipe_name}")
-    recipe_id, duration = row['id'], row['duration']
-
-    brow = db.execute("""
-        SELECT b.name, b.power_used FROM recipe_buildings rb
-        JOIN buildings b ON b.id = rb.building_id
-        WHERE rb.recipe_id = ?
-    """, (recipe_id,)).fetchone()
-    building = brow['name'] if brow else "Unknown"
-    power = float(brow['power_used']) if brow and brow['power_used'] else 0
-
-    inputs = {}
-    for r in db.execute("""
-        SELECT i.name, ri.quantity FROM recipe_ingredients ri
-        JOIN items i ON i.id = ri.item_id WHERE ri.recipe_id = ?
-    """, (recipe_id,)):
-        rate = float(r['quantity']) / duration * 60
-        if r['quantity'] >= 1000 and is_fluid(r['name']):
-            inputs[r['name']] = rate / 1000
-        else:
-            inputs[r['name']] = rate
-
-    outputs = {}
-    for r in db.execute("""
-        SELECT i.name, rp.quantity FROM recipe_products rp
-        JOIN items i ON i.id = rp.item_id WHERE rp.recipe_id = ?
-    """, (recipe_id,)):
-        rate = float(r['quantity']) / duration * 60
-        if r['quantity'] >= 1000 and is_fluid(r['name']):
-            outputs[r['name']] = rate / 1000
-        else:
-            outputs[r['name']] = rate
-
+    building, power = graph.recipe_building(recipe_name)
+    outputs, inputs = graph.recipe_io(recipe_name)
     return {
-        "building": building, "power": power,
-        "inputs": inputs, "outputs": outputs
+        "building": building or "Unknown", "power": float(power),
+        "inputs": dict(inputs), "outputs": dict(outputs)
     }
 
 FLUID_ITEMS = {"Water", "Crude Oil", "Heavy Oil Residue", "Alumina Solution",
@@ -97,7 +67,7 @@ def shards_for_clock(clock_pct):
     else:
         raise ValueError(f"Clock {clock_pct}% exceeds max 250%")
 
-# Building footprint (width × length) — larger = higher priority for shard use
+# Building footprint (width × length) — the space a shard-saved building frees
 BUILDING_FOOTPRINT = {
     "Manufacturer": 440,  # 20×22
     "Blender": 304,       # 19×16
@@ -340,8 +310,9 @@ def compute_module(factory_key, factory_def, shard_budget=None):
 
     copies = math.ceil(factory_def["target_hmf"] / hmf_rate - 0.001)
 
-    # Collect optimization candidates
-    candidates = []
+    # Collect optimization candidates: one group per fractional step, one
+    # option per number of buildings saved (mutually exclusive)
+    groups = []
     for i, step in enumerate(steps):
         be = step["buildings_exact"]
         bc = step["buildings_ceil"]
@@ -352,41 +323,39 @@ def compute_module(factory_key, factory_def, shard_budget=None):
         if frac < 0.001 or frac > 0.999:
             continue  # Already exact, no savings
 
-        # New building count = bc - 1
-        new_count = bc - 1
-        # Each building must run at this clock to produce the same output
-        new_clock = (be / new_count) * 100
-        shards_needed = shards_for_clock(new_clock)
-
-        if new_clock > 250:
-            continue  # Can't overclock that much
-
-        # Total shards = shards_per_building * new_count * copies
-        total_shards = shards_needed * new_count * copies
-
-        candidates.append({
-            "step_idx": i,
-            "building": step["building"],
-            "old_count": bc,
-            "new_count": new_count,
-            "new_clock": round(new_clock, 1),
-            "shards_per_building": shards_needed,
-            "total_shards": total_shards,
-            "buildings_saved_per_copy": 1,
-            "buildings_saved_total": copies,
-        })
-
-    # Sort: largest buildings first (most space saved), then fewest shards
-    candidates.sort(key=lambda c: (-BUILDING_FOOTPRINT.get(c["building"], 0), c["total_shards"]))
-
-    # Allocate shards greedily
-    shards_used = 0
+        options = []
+        for saved in range(1, shard_knapsack.MAX_SAVED + 1):
+            new_count = bc - saved
+            if new_count < 1:
+                break
+            # Each building must run at this clock to produce the same output
+            new_clock = (be / new_count) * 100
+            if new_clock > 250:
+                break  # Can't overclock that much
+
+            shards_needed = shards_for_clock(new_clock)
+            # Total shards = shards_per_building * new_count * copies
+            total_shards = shards_needed * new_count * copies
+
+            options.append({
+                "step_idx": i,
+                "building": step["building"],
+                "old_count": bc,
+                "new_count": new_count,
+                "new_clock": round(new_clock, 1),
+                "shards_per_building": shards_needed,
+                "total_shards": total_shards,
+                "buildings_saved_per_copy": saved,
+                "buildings_saved_total": saved * copies,
+                "footprint_saved": BUILDING_FOOTPRINT.get(step["building"], 0) * saved * copies,
+            })
+        if options:
+            groups.append(options)
+
+    # Exact shard allocation (multiple-choice knapsack on footprint saved)
     applied = []
     if shard_budget is not None:
-        for c in candidates:
-            if shards_used + c["total_shards"] <= shard_budget:
-                shards_used += c["total_shards"]
-                applied.append(c)
+        applied = shard_knapsack.solve(groups, shard_budget)
 
     # Apply optimizations
     for opt in applied:
@@ -690,7 +659,8 @@ for key in ["ferrium", "naphtheon", "forgeholm", "luxara", "cathera"]:
     base_modules[key] = compute_module(key, FACTORIES[key], shard_budget=None)
 
 # Step 2: Collect ALL optimization candidates globally with copy counts
-all_candidates = []
+# (one group per fractional step; options = buildings saved per copy)
+all_groups = []
 for key in ["ferrium", "naphtheon", "forgeholm", "luxara", "cathera"]:
     mod = base_modules[key]
     copies = mod["copies_needed_ceil"]
@@ -704,40 +674,47 @@ for key in ["ferrium", "naphtheon", "forgeholm", "luxara", "cathera"]:
         if frac < 0.001 or frac > 0.999:
             continue
 
-        new_count = bc - 1
-        new_clock = (be / new_count) * 100
-        if new_clock > 250:
-            continue
-
-        shards_needed = shards_for_clock(new_clock)
-        total_shards = shards_needed * new_count * copies
-
-        all_candidates.append({
-            "factory": key,
-            "item": step["item"],
-            "building": step["building"],
-            "old_count": bc,
-            "new_count": new_count,
-            "new_clock": round(new_clock, 1),
-            "shards_per_building": shards_needed,
-            "shards_per_module": shards_needed * new_count,
-            "total_shards": total_shards,
-            "copies": copies,
-        })
-
-# Step 3: Greedy allocation - largest buildings first (most space saved), then fewest shards
-all_candidates.sort(key=lambda c: (-BUILDING_FOOTPRINT.get(c["building"], 0), c["total_shards"]))
-
-shard_budget_remaining = TOTAL_SHARD_BUDGET
+        options = []
+        for saved in range(1, shard_knapsack.MAX_SAVED + 1):
+            new_count = bc - saved
+            if new_count < 1:
+                break
+            new_clock = (be / new_count) * 100
+            if new_clock > 250:
+                break
+
+            shards_needed = shards_for_clock(new_clock)
+            total_shards = shards_needed * new_count * copies
+
+            options.append({
+                "factory": key,
+                "item": step["item"],
+                "building": step["building"],
+                "old_count": bc,
+                "new_count": new_count,
+                "new_clock": round(new_clock, 1),
+                "shards_per_building": shards_needed,
+                "shards_per_module": shards_needed * new_count,
+                "total_shards": total_shards,
+                "copies": copies,
+                "footprint_saved": BUILDING_FOOTPRINT.get(step["building"], 0) * saved * copies,
+            })
+        if options:
+            all_groups.append(options)
+
+# Step 3: Exact allocation - maximize footprint saved within the budget
+# (the old greedy, largest buildings first then fewest shards, is kept only
+# to report how far off it would have been)
+selected = shard_knapsack.solve(all_groups, TOTAL_SHARD_BUDGET)
+greedy_selected = shard_knapsack.greedy(
+    all_groups, TOTAL_SHARD_BUDGET,
+    key=lambda c: (-BUILDING_FOOTPRINT.get(c["building"], 0), c["total_shards"]))
+
+shard_budget_remaining = TOTAL_SHARD_BUDGET - shard_knapsack.cost(selected)
 # Track total shards per factory (across ALL copies)
 factory_total_shards = {k: 0 for k in ["ferrium", "naphtheon", "forgeholm", "luxara", "cathera"]}
-selected = []
-
-for c in all_candidates:
-    if shard_budget_remaining >= c["total_shards"]:
-        shard_budget_remaining -= c["total_shards"]
-        factory_total_shards[c["factory"]] += c["total_shards"]
-        selected.append(c)
+for c in selected:
+    factory_total_shards[c["factory"]] += c["total_shards"]
 
 # Step 4: Recompute modules with exact per-factory shard budgets
 result = {
@@ -782,4 +759,6 @@ with open('/Users/deepak/AI/satisfy/factory-modules.txt', 'w') as f:
     f.write(text_output)
 
 print(text_output)
+print(shard_knapsack.gap_report("Shard allocation", selected, greedy_selected,
+                                TOTAL_SHARD_BUDGET))
 print("\n--- Files written: factory-subunits.json, factory-modules.txt ---")
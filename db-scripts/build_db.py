@@ -12,12 +12,19 @@ Schema design:
 - schematics: milestones/research with tier info
 - schematic_recipes: schematic_id -> recipe_class (what it unlocks)
 - schematic_requirements: schematic_id -> required schematic_class
+
+Also writes satisfactory.graph next to the DB: the versioned, mmap-able
+recipe-graph snapshot (see recipe_graph.py), keyed to this DB's content hash.
 """
 
 import json
 import sqlite3
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import recipe_graph  # noqa: E402  (repo-root module)
+
 DATA_DIR = Path(__file__).parent / "data"
 DB_PATH = Path(__file__).parent / "satisfactory.db"
 
@@ -335,6 +342,10 @@ def build():
 
     db.close()
 
+    # ── Recipe-graph snapshot (mmap-loaded by the pipeline scripts) ──
+    snap = recipe_graph.write_snapshot(str(DB_PATH))
+    print(f"  Snapshot: {snap} (v{recipe_graph.SNAPSHOT_VERSION})")
+
 
 if __name__ == "__main__":
     build()
@@ -5,7 +5,8 @@ supply-chain must satisfy.
 
 What it does
 ------------
-1. Decodes every tab of the authoritative .sft plan and collects, per tab:
+1. Streams every tab of the authoritative .sft plan (sft_stream) and
+   collects, per tab:
    - production targets (units/min)            -> the SET needs
    - input list (items already available)      -> recursion STOPS here (free)
    - blockedRecipes / blockedResources         -> may not use / may not mine
@@ -25,12 +26,17 @@ What it does
    via input and NOT already net-positive in current-production.txt.
 5. Resolves the HSC and Copper Powder verdicts with explicit arithmetic.
 
-DB: satisfactory.db (rate/min = quantity * 60 / duration).
+DB: satisfactory.db via recipe_graph (rate/min = quantity * 60 / duration).
+
+Run: python3 derive_demand_A.py [--jobs N]   (N tabs solved in parallel)
 """
 
-import base64, zlib, json, sqlite3, os, sys
+import argparse, json, multiprocessing, os, sys
 from collections import defaultdict
 
+import recipe_graph
+import sft_stream
+
 REPO = os.path.dirname(os.path.abspath(__file__))
 DB = os.path.join(REPO, "satisfactory.db")
 SFT = os.path.join(REPO, "planner-export", "sftools-export-2026-04-01-20-02-03.sft")
@@ -48,44 +54,31 @@ RAW = {
 # ---------------------------------------------------------------------------
 # Load DB recipe data
 # ---------------------------------------------------------------------------
-con = sqlite3.connect(DB)
-cur = con.cursor()
+graph = recipe_graph.load(DB)
 
-item_name = {}
-item_cat = {}
-for iid, nm, cat in cur.execute("SELECT id, name, category FROM items"):
-    item_name[iid] = nm
-    item_cat[iid] = cat
+item_name = dict(zip(graph.item_id, graph.item_name))
+item_cat = dict(zip(graph.item_id, graph.item_category))
 
 # Fluids are stored in mL in the DB; the .sft production `amount` is in m3/min.
-# Normalize every fluid quantity by /1000 at load time so all rates are in the
-# same unit basis (m3/min for fluids, units/min for solids).
+# The graph normalizes every fluid quantity by /1000 at load time so all rates
+# are in the same unit basis (m3/min for fluids, units/min for solids).
 FLUIDS = {iid for iid, c in item_cat.items() if c in ("liquid", "gas")}
 
-
-def norm(iid, qty):
-    return qty / 1000.0 if iid in FLUIDS else qty
-
-
-# recipe -> {duration, class_name, ingredients:[(item,qty)], products:[(item,qty)]}
+# recipe -> {duration, class_name, ing:[(item,per_min)], prod:[(item,per_min)]}
+# (per-building rates; every ratio below is unit-free so per-min == per-cycle)
+ids = graph.item_id
 recipes = {}
-for rid, cn, dur in cur.execute("SELECT id, class_name, duration FROM recipes"):
-    recipes[rid] = {"class_name": cn or "", "duration": dur or 1.0,
-                    "ing": [], "prod": []}
-for rid, iid, qty in cur.execute(
-        "SELECT recipe_id, item_id, quantity FROM recipe_ingredients"):
-    if rid in recipes:
-        recipes[rid]["ing"].append((iid, norm(iid, qty)))
-for rid, iid, qty in cur.execute(
-        "SELECT recipe_id, item_id, quantity FROM recipe_products"):
-    if rid in recipes:
-        recipes[rid]["prod"].append((iid, norm(iid, qty)))
+for r, rid in enumerate(graph.recipe_id):
+    recipes[rid] = {"class_name": graph.recipe_class[r],
+                    "duration": graph.recipe_duration[r],
+                    "ing": [(ids[i], q) for i, q in graph.inputs(r)],
+                    "prod": [(ids[i], q) for i, q in graph.outputs(r)]}
 
 # item -> list of recipe ids that produce it
 produced_by = defaultdict(list)
-for rid, r in recipes.items():
-    for iid, _ in r["prod"]:
-        produced_by[iid].append(rid)
+for i, rs in enumerate(graph.producers):
+    if rs:
+        produced_by[ids[i]] = [graph.recipe_id[r] for r in rs]
 
 
 def is_alternate(rid):
@@ -96,19 +89,6 @@ def is_unpackage(rid):
     return "Unpackage" in rid or "Unpackage" in recipes[rid]["class_name"]
 
 
-def rate(recipe, iid, qty):
-    """units/min that `recipe` produces/consumes of item iid at qty per cycle."""
-    return qty * 60.0 / recipe["duration"]
-
-
-# ---------------------------------------------------------------------------
-# Decode the .sft
-# ---------------------------------------------------------------------------
-lines = open(SFT).read().splitlines()
-payload = next(l for l in lines if l and not l.startswith("#"))
-plan = json.loads(zlib.decompress(base64.b64decode(payload[1:])))
-TABS = plan["tabs"]
-
 
 # ---------------------------------------------------------------------------
 # Per-tab recipe selection + decomposition
@@ -218,11 +198,11 @@ class TabSolver:
         r = recipes[rid]
         prod = dict((p, q) for p, q in r["prod"])
         main_qty = prod[item]
-        cycles_per_min = amount / main_qty           # crafts/min needed
+        machines = amount / main_qty                 # buildings @100% needed
         made[item] += amount
         stack = stack | {item}
         for ing, q in r["ing"]:
-            self.decompose(ing, q * cycles_per_min, raw, made, stack)
+            self.decompose(ing, q * machines, raw, made, stack)
 
     def run(self):
         raw = defaultdict(float)
@@ -235,22 +215,49 @@ class TabSolver:
 # ---------------------------------------------------------------------------
 # Run all tabs, aggregate
 # ---------------------------------------------------------------------------
+ap = argparse.ArgumentParser()
+ap.add_argument("--jobs", type=int, default=1,
+                help="solve tabs in N worker processes (0 = one per core)")
+ARGS = ap.parse_args()
+
+
+def solve_tab(tab):
+    """Solve one tab; picklable summary for the pool."""
+    s = TabSolver(tab)
+    raw, made = s.run()
+    return (s.name, s.inputs, dict(raw), dict(made), s.errors,
+            tab["request"].get("production", []))
+
+
+def solve_all(jobs):
+    """Per-tab results in tab order, solved as the .sft streams in (the
+    decoded plan is never held whole). With jobs > 1 the tabs fan out over a
+    fork()ed pool: the recipe tables are inherited copy-on-write and each tab
+    is pickled to a worker as it is decoded."""
+    tabs = sft_stream.iter_tabs(SFT)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs <= 1:
+        return [solve_tab(t) for t in tabs]
+    with multiprocessing.get_context("fork").Pool(jobs) as pool:
+        return list(pool.imap(solve_tab, tabs))
+
+
 total_raw = defaultdict(float)
 total_made = defaultdict(float)            # item -> units/min the plan manufactures
 supplied_via_input = set()                 # items some tab marks as input
 all_errors = []
 
+# merged in tab order, so the sums are bit-identical to a serial run
 per_tab = []
-for i, tab in enumerate(TABS):
-    s = TabSolver(tab)
-    supplied_via_input |= s.inputs
-    raw, made = s.run()
+results = solve_all(ARGS.jobs)
+for i, (name, inputs, raw, made, errors, targets) in enumerate(results):
+    supplied_via_input |= inputs
     for k, v in raw.items():
         total_raw[k] += v
     for k, v in made.items():
         total_made[k] += v
-    per_tab.append((i, s.name, dict(raw), dict(made)))
-    all_errors += [f"tab{i} {s.name}: {e}" for e in s.errors]
+    per_tab.append((i, name, raw, made, targets))
+    all_errors += [f"tab{i} {name}: {e}" for e in errors]
 
 # ---------------------------------------------------------------------------
 # current-production.txt : net = produced - consumed
@@ -385,9 +392,9 @@ print()
 print("=" * 72)
 print("PER-TAB raw demand")
 print("=" * 72)
-for i, nm, raw, made in per_tab:
+for i, nm, raw, made, targets in per_tab:
     tgts = ", ".join(f"{item_name.get(t['item'],t['item'])}={t['amount']}"
-                     for t in TABS[i]['request'].get('production', []))
+                     for t in targets)
     print(f"-- tab {i} [{nm}] : {tgts}")
     for item, v in sorted(raw.items(), key=lambda x: -x[1]):
         print(f"     {item_name.get(item,item):16s} {round(v,1):>10}")
@@ -415,7 +422,7 @@ print()
 print("=" * 72)
 print("SANITY: chosen min-cost recipe for key items (tab0 = Special factories)")
 print("=" * 72)
-s0 = TabSolver(TABS[0])
+s0 = TabSolver(next(sft_stream.iter_tabs(SFT)))
 for it in ["Desc_SpaceElevatorPart_7_C", "Desc_SpaceElevatorPart_8_C",
            "Desc_SpaceElevatorPart_6_C", "Desc_SpaceElevatorPart_9_C"]:
     r = s0.best_recipe(it)
@@ -24,10 +24,28 @@ KEY MODELLING DECISIONS (my own, to catch errors in the other derivation):
     NOT raw and NOT a tab input. Stop at raws (-> raw_demand) and inputs (-> used).
   * Gap = items the chain must MANUFACTURE that are NOT covered by input and NOT
     raw. Then credit live production (current-production.txt) for the net gap.
+  * --solver lp replaces the cost + quantity solves with ONE linear program per
+    tab: machine counts x_r >= 0 for every runnable, reachable recipe, one row
+    per item (out - in + draw - surplus = target). Raws/inputs have a draw
+    column; anything else can only be made (or lands in `unbuildable`).
+    Objective, lexicographic: unbuildable units, then weighted raw draw, then
+    machine count (tie-break, also kills useless loops). By-products are
+    credited exactly, and recipe cycles (Heavy Oil Residue, Water) converge
+    without an iteration cap. Backend: scipy's HiGHS when installed, else the
+    pure-Python simplex below.
 
-Run: python3 derive_demand_B.py
+Run: python3 derive_demand_B.py [--solver relax|lp] [--jobs N]
 """
-import base64, zlib, json, sqlite3, os, collections
+import argparse, collections, functools, multiprocessing, os
+from fractions import Fraction
+
+try:
+    from scipy.optimize import linprog
+except ImportError:          # optional; the pure-Python simplex is the fallback
+    linprog = None
+
+import recipe_graph
+import sft_stream
 
 ROOT = os.path.dirname(os.path.abspath(__file__))
 DB   = os.path.join(ROOT, 'satisfactory.db')
@@ -40,45 +58,25 @@ KNOWN_RAW = {
     'Desc_OreUranium_C','Desc_NitrogenGas_C','Desc_SAM_C','Desc_Water_C',
 }
 
-# ---------------------------------------------------------------- load .sft
-def load_sft(fn):
-    lines = open(fn).read().splitlines()
-    payload = next(l for l in lines if l and not l.startswith('#'))
-    return json.loads(zlib.decompress(base64.b64decode(payload[1:])))
-
 # ---------------------------------------------------------------- load DB
 def load_db():
-    con = sqlite3.connect(DB); cur = con.cursor()
-    items = {}
-    for iid, name, cat in cur.execute('select id,name,category from items'):
-        items[iid] = {'name': name, 'category': cat}
+    g = recipe_graph.load(DB)
+    items = {iid: {'name': nm, 'category': cat}
+             for iid, nm, cat in zip(g.item_id, g.item_name, g.item_category)}
     fluids = {iid for iid, d in items.items() if d['category'] in ('liquid', 'gas')}
-    # recipe_ingredients/products.recipe_id == recipes.id (short Recipe_*_C),
-    # which is the form the .sft uses for blocked/allowed lists. NOT class_name.
-    dur = {rid: (nm, d) for rid, nm, d in cur.execute('select id,name,duration from recipes')}
-    ing = collections.defaultdict(list)
-    for rid, it, q in cur.execute('select recipe_id,item_id,quantity from recipe_ingredients'):
-        ing[rid].append((it, q))
-    prod = collections.defaultdict(list)
-    for rid, it, q in cur.execute('select recipe_id,item_id,quantity from recipe_products'):
-        prod[rid].append((it, q))
-    con.close()
-
-    def rate(it, q, d):
-        r = q * 60.0 / d
-        if it in fluids:
-            r /= 1000.0   # mL -> m^3
-        return r
-
+    # recipe ids are the short Recipe_*_C form the .sft uses for blocked/allowed
+    # lists. NOT class_name. Rates are per-min with fluids already in m^3/min.
+    ids = g.item_id
     recipes = {}
-    for rid in set(list(ing) + list(prod)):
-        nm, d = dur.get(rid, (rid, None))
-        if not d:
+    for r, rid in enumerate(g.recipe_id):
+        ins, outs = g.inputs(r), g.outputs(r)
+        if not ins and not outs:
             continue
+        out = [(ids[i], q) for i, q in outs]
         recipes[rid] = {
-            'name': nm, 'duration': d,
-            'in':  [(it, rate(it, q, d)) for it, q in ing.get(rid, [])],
-            'out': [(it, rate(it, q, d)) for it, q in prod.get(rid, [])],
+            'name': g.recipe_name[r], 'duration': g.recipe_duration[r],
+            'in':  [(ids[i], q) for i, q in ins],
+            'out': out, 'out_rate': dict(out),
         }
     return items, recipes, fluids
 
@@ -100,32 +98,31 @@ def usable_recipes(req):
     return out
 
 def producers_index(recs):
+    """Precompiled form of a tab's usable recipes, built ONCE per tab and
+    shared by the cost solve, choose_recipe and the quantity solve:
+    {item: [(rid, out_rate, ingredients)]}, out_rate > 0 only."""
     idx = collections.defaultdict(list)
     for rid, r in recs.items():
         for it, rate in r['out']:
             if rate > 0:
-                idx[it].append(rid)
+                idx[it].append((rid, rate, r['in']))
     return idx
 
 # ---- cost solve (no by-product credit, to stay loop-free & non-negative) ----
-def weighted_costs(recs, weights, raws, stop_items):
+def weighted_costs(idx, weights, raws, stop_items):
     INF = float('inf')
     cost = {it: weights.get(it, 0.0) for it in raws}
     for it in stop_items:
         cost[it] = 0.0    # tab inputs are free; we never build them
-    idx = producers_index(recs)
     for _ in range(500):
         changed = False
-        for it, rids in idx.items():
+        for it, prods in idx.items():
             if it in stop_items or it in raws:
                 continue
             best = cost.get(it, INF)
-            for rid in rids:
-                r = recs[rid]
-                out_rate = dict(r['out']).get(it, 0)
-                if out_rate <= 0: continue
+            for rid, out_rate, ins in prods:
                 tot = 0.0; ok = True
-                for ii, irate in r['in']:
+                for ii, irate in ins:
                     c = cost.get(ii, INF)
                     if c == INF: ok = False; break
                     tot += c * irate
@@ -139,15 +136,11 @@ def weighted_costs(recs, weights, raws, stop_items):
             break
     return cost
 
-def choose_recipe(it, recs, cost):
-    idx = producers_index(recs)
+def choose_recipe(it, idx, cost):
     best = None; bestc = float('inf')
-    for rid in idx.get(it, []):
-        r = recs[rid]
-        out_rate = dict(r['out']).get(it, 0)
-        if out_rate <= 0: continue
+    for rid, out_rate, ins in idx.get(it, ()):
         tot = 0.0; ok = True
-        for ii, irate in r['in']:
+        for ii, irate in ins:
             c = cost.get(ii, float('inf'))
             if c == float('inf'): ok = False; break
             tot += c * irate
@@ -166,7 +159,8 @@ def decompose_tab(tab):
     inputs = {p['item']: p['amount'] for p in req.get('input', [])}
     stop = set(inputs)
     recs = usable_recipes(req)
-    cost = weighted_costs(recs, weights, raws, stop)
+    idx = producers_index(recs)
+    cost = weighted_costs(idx, weights, raws, stop)
 
     # lock one recipe per buildable item
     rchoice = {}
@@ -210,13 +204,13 @@ def decompose_tab(tab):
             continue
 
         q = need[target]; need[target] = 0.0
-        rid = rchoice.get(target) or choose_recipe(target, recs, cost)
+        rid = rchoice.get(target) or choose_recipe(target, idx, cost)
         rchoice[target] = rid
         if rid is None:
             unbuildable[target] += q
             continue
         r = recs[rid]
-        out_rate = dict(r['out']).get(target, 0)
+        out_rate = r['out_rate'][target]
         runs = q / out_rate
         manufactured[target] += q
         for oi, orate in r['out']:
@@ -236,6 +230,218 @@ def decompose_tab(tab):
         'rchoice': rchoice,
     }
 
+# ---- LP mode: one simplex solve per tab -------------------------------------
+LP_TOL = 1e-9
+LP_DENOM = 10**6                 # snap: DB rates are q*60/duration fractions
+
+def _snap(x):
+    """Float pivot result -> the nearby small-denominator rational it stands
+    for (rates are q*60/duration, so round-off is the only noise)."""
+    return Fraction(x).limit_denominator(LP_DENOM)
+
+def simplex(rows, rhs, costs, basis):
+    """Minimize the lexicographic objective `costs` (list of {col: c}, highest
+    priority first) s.t. rows[i] . x = rhs[i], x >= 0. `basis[i]` must be a
+    column with coefficient 1 in row i only (rhs >= 0 -> feasible start).
+    Sparse float tableau; entries within LP_TOL of zero are dropped, and the
+    solution is snapped to exact rationals at the end. Dantzig pricing with
+    a Bland's-rule fallback against degenerate cycling. -> {col: Fraction}."""
+    rows = [dict(r) for r in rows]
+    rhs = [float(v) for v in rhs]; basis = list(basis)
+    # reduced costs: c - c_B B^-1 A, one sparse row per objective level
+    red = []
+    for c in costs:
+        rc = dict(c)
+        for i, b in enumerate(basis):
+            f = rc.get(b)
+            if f:
+                for k, v in rows[i].items():
+                    rc[k] = rc.get(k, 0.0) - f * v
+        red.append({k: v for k, v in rc.items() if abs(v) > LP_TOL})
+    cols = sorted({k for r in rows for k in r})
+
+    def eliminate(r, f, prow):
+        for k, v in prow.items():
+            nv = r.get(k, 0.0) - f * v
+            if abs(nv) > LP_TOL: r[k] = nv
+            else: r.pop(k, None)
+
+    stall = 0
+    while True:
+        # Dantzig pricing (most negative reduced cost at the highest-priority
+        # level); after a run of degenerate pivots fall back to Bland's rule
+        # (lowest index) until the objective moves again.
+        enter = None; key = None
+        for j in cols:
+            for lvl, rc in enumerate(red):      # lexicographic sign
+                v = rc.get(j)
+                if v: break
+            if v and v < -LP_TOL:
+                if stall >= 50:
+                    enter = j; break
+                if key is None or (lvl, v) < key:
+                    enter, key = j, (lvl, v)
+        if enter is None:
+            x = {}
+            for i, b in enumerate(basis):
+                v = _snap(rhs[i])
+                if v > 0: x[b] = v
+            return x
+        leave = None; best = None
+        for i, r in enumerate(rows):
+            a = r.get(enter)
+            if a and a > LP_TOL:
+                t = rhs[i] / a
+                if best is None or t < best - LP_TOL or (
+                        t <= best + LP_TOL and basis[i] < basis[leave]):
+                    best, leave = t, i
+        if leave is None:
+            raise ValueError('LP unbounded')
+        stall = stall + 1 if best <= LP_TOL else 0
+        p = rows[leave][enter]
+        prow = rows[leave] = {k: v / p for k, v in rows[leave].items()}
+        prow[enter] = 1.0
+        rhs[leave] /= p
+        for i, r in enumerate(rows):
+            f = r.get(enter)
+            if i == leave or not f: continue
+            eliminate(r, f, prow)
+            r.pop(enter, None)
+            rhs[i] -= f * rhs[leave]
+            if abs(rhs[i]) <= LP_TOL: rhs[i] = 0.0
+        for rc in red:
+            f = rc.get(enter)
+            if not f: continue
+            eliminate(rc, f, prow)
+            rc.pop(enter, None)
+        basis[leave] = enter
+
+def _scipy_solve(rows, rhs, costs, ncols):
+    """Same lexicographic LP through HiGHS: solve each level, then pin it."""
+    A_eq = [[r.get(j, 0.0) for j in range(ncols)] for r in rows]
+    A_ub, b_ub = [], []
+    x = None
+    for c in costs:
+        cv = [c.get(j, 0.0) for j in range(ncols)]
+        res = linprog(cv, A_ub=A_ub or None, b_ub=b_ub or None, A_eq=A_eq,
+                      b_eq=rhs, bounds=(0, None), method='highs')
+        if res.status != 0:
+            raise ValueError(f'LP failed: {res.message}')
+        x = res.x
+        A_ub.append(cv); b_ub.append(res.fun + max(1e-7, abs(res.fun) * 1e-9))
+    return {j: v for j, v in enumerate(x) if v}
+
+def decompose_tab_lp(tab, backend='auto'):
+    req = tab['request']
+    weights = req.get('resourceWeight', {})
+    blocked_res = set(req.get('blockedResources', []))
+    raws = (set(KNOWN_RAW) | set(weights.keys())) - blocked_res
+    inputs = {p['item']: p['amount'] for p in req.get('input', [])}
+    stop = set(inputs)
+    recs = usable_recipes(req)
+    idx = producers_index(recs)
+    production = {}
+    for p in req.get('production', []):
+        production[p['item']] = production.get(p['item'], 0.0) + p['amount']
+
+    # columns: only recipes that can run at all (every ingredient is a raw,
+    # an input or made by another runnable recipe) and that are reachable
+    # backward from the targets (never expand raws/inputs)
+    obtainable, runnable = set(raws) | stop, set()
+    grew = True
+    while grew:
+        grew = False
+        for rid, r in recs.items():
+            if rid not in runnable and all(i in obtainable for i, _ in r['in']):
+                runnable.add(rid); grew = True
+                obtainable.update(o for o, _ in r['out'])
+    rids, seen = [], set()
+    todo = list(production)
+    while todo:
+        it = todo.pop()
+        if it in seen or it in stop or it in raws: continue
+        seen.add(it)
+        for rid, _, _ in idx.get(it, ()):
+            if rid in runnable and rid not in rids:
+                rids.append(rid)
+                todo.extend(ii for ii, _ in recs[rid]['in'])
+    rids.sort()
+    items = sorted(set(production)
+                   | {i for rid in rids for i, _ in recs[rid]['in'] + recs[rid]['out']})
+    row_of = {it: n for n, it in enumerate(items)}
+
+    # columns: recipes, then per item a draw/unbuildable column and a surplus
+    # (by-product overflow)
+    rows = [{} for _ in items]
+    for j, rid in enumerate(rids):
+        for it, rate in recs[rid]['out']:
+            rows[row_of[it]][j] = rows[row_of[it]].get(j, 0.0) + rate
+        for it, rate in recs[rid]['in']:
+            rows[row_of[it]][j] = rows[row_of[it]].get(j, 0.0) - rate
+    unbuilt, raw_cost, runs = {}, {}, {j: 1.0 for j in range(len(rids))}
+    basis, draw_col = [], {}
+    ncols = len(rids)
+    rhs = [production.get(it, 0.0) for it in items]
+    for n, it in enumerate(items):
+        draw_col[it] = ncols
+        if it in stop: pass
+        elif it in raws: raw_cost[ncols] = weights.get(it, 0.0)
+        else: unbuilt[ncols] = 1.0
+        if rhs[n] > 0:                          # target row: start on the draw
+            rows[n][ncols] = 1.0; rows[n][ncols + 1] = -1.0
+            basis.append(ncols)
+        else:                                   # "net output >= 0" row: start
+            rows[n] = {k: -v for k, v in rows[n].items()}   # on its surplus
+            rows[n][ncols] = -1.0; rows[n][ncols + 1] = 1.0
+            basis.append(ncols + 1)
+        ncols += 2
+    costs = [unbuilt, raw_cost, runs]
+    if backend == 'scipy' or (backend == 'auto' and linprog is not None):
+        x = _scipy_solve(rows, rhs, costs, ncols)
+    else:
+        x = {j: float(v) for j, v in simplex(rows, rhs, costs, basis).items()}
+
+    manufactured = collections.defaultdict(float)
+    rchoice, best = {}, {}
+    for j, rid in enumerate(rids):
+        v = x.get(j, 0.0)
+        if v <= LP_TOL: continue
+        for it, rate in recs[rid]['out']:
+            if it in stop or it in raws: continue
+            manufactured[it] += rate * v
+            if rate * v > best.get(it, 0.0):
+                best[it] = rate * v; rchoice[it] = rid
+    raw_demand, used_input, unbuildable = {}, {}, {}
+    for it, col in draw_col.items():
+        v = x.get(col, 0.0)
+        if v <= LP_TOL: continue
+        (used_input if it in stop else raw_demand if it in raws
+         else unbuildable)[it] = v
+
+    return {
+        'name': tab['metadata'].get('name'),
+        'production': {p['item']: p['amount'] for p in req.get('production', [])},
+        'manufactured': dict(manufactured),
+        'raw_demand': raw_demand,
+        'used_input': used_input,
+        'unbuildable': unbuildable,
+        'inputs': inputs,
+        'rchoice': rchoice,
+    }
+
+# ---- parallel tabs: fork()ed pool, deterministic merge -----------------------
+def solve_tabs(tabs, solve, jobs=1):
+    """[solve(tab) for tab in tabs] over a tab STREAM, optionally fanned out
+    to `jobs` worker processes (0 = one per core). Workers are fork()ed, so
+    the recipe tables are shared copy-on-write; each tab is pickled to a
+    worker as it is decoded. Results come back in tab order -> aggregates
+    identical to a serial run."""
+    jobs = jobs or os.cpu_count() or 1
+    if jobs <= 1:
+        return [solve(t) for t in tabs]
+    with multiprocessing.get_context('fork').Pool(jobs) as pool:
+        return list(pool.imap(solve, tabs))
+
 def nm(it):
     return ITEMS.get(it, {}).get('name', it)
 
@@ -256,8 +462,20 @@ def load_live():
     return live
 
 if __name__ == '__main__':
-    j = load_sft(SFT)
-    results = [decompose_tab(t) for t in j['tabs']]
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--solver', choices=('relax', 'lp'), default='relax',
+                    help='relax = cost relaxation + drain loop (default); '
+                         'lp = one linear program per tab')
+    ap.add_argument('--backend', choices=('auto', 'simplex', 'scipy'),
+                    default='auto', help='LP backend (auto = scipy if installed)')
+    ap.add_argument('--jobs', type=int, default=1,
+                    help='solve tabs in N worker processes (0 = one per core)')
+    args = ap.parse_args()
+    if args.solver == 'lp':
+        solve = functools.partial(decompose_tab_lp, backend=args.backend)
+    else:
+        solve = decompose_tab
+    results = solve_tabs(sft_stream.iter_tabs(SFT), solve, args.jobs)
     live = load_live()
 
     print('================ PER-TAB ================')
@@ -12,16 +12,39 @@ amounts phase.
 
 Coordinate convention: +x=east/right, +y=south/bottom, cm (100=1m).
 Top-left = NW = (x<0,y<0); bottom-right = SE = (x>0,y>0).
+
+Tuning: python3 find_gap_factory_locations.py --sweep SEARCH_RADIUS=60000,70000
+    --sweep MIN_SEPARATION=20000,25000 [--jobs N]
+runs allocate() for every combination and prints haul / infeasible / shards /
+sites per row, without writing the JSON or the map data.
+--optimize SECONDS [--jobs N] anneals over job order and primary-center picks
+from the greedy allocation and writes whichever plan is better.
 """
-import base64
+import argparse
+import bisect
+import copy
+import glob
+import hashlib
+import heapq
+import itertools
 import json
 import math
+import multiprocessing
+import os
+import random
 import re
-import sqlite3
-import zlib
-from collections import defaultdict, deque
-
-MAP_HTML = 'factory-map.html'
+import time
+from array import array
+from collections import OrderedDict, defaultdict, deque
+from fractions import Fraction
+
+import clustering
+import node_columns
+import recipe_graph
+import sft_stream
+
+MAP_DATA = 'gap-map-data.json'   # pointer to the content-hashed map data
+MAP_DATA_SCHEMA = 2              # 2: node lists via node_columns
 SFT_EXPORT = 'planner-export/sftools-export-2026-04-01-20-02-03.sft'
 
 # ---------------------------------------------------------------- paths/const
@@ -118,10 +141,6 @@ ITEM_TO_NODETYPE = {
     'Raw Quartz': 'quartz', 'Sulfur': 'sulfur', 'SAM': 'sam',
     'Uranium': 'uranium', 'Crude Oil': 'oil', 'Nitrogen Gas': 'nitrogenGas',
 }
-FLUID_ITEMS = {'Water', 'Crude Oil', 'Nitrogen Gas', 'Alumina Solution',
-               'Sulfuric Acid', 'Heavy Oil Residue', 'Fuel', 'Liquid Biofuel',
-               'Nitric Acid', 'Dissolved Silica', 'Ionized Fuel',
-               'Rocket Fuel', 'Turbofuel'}
 # default-recipe overrides where the std resolver picks a wrong primary (A8)
 DEFAULT_OVERRIDE = {'Heavy Oil Residue': 'Alternate: Heavy Oil Residue'}
 
@@ -198,20 +217,9 @@ FLAVOR_SPLITS = {item: _rescale(w, GAP_TARGETS[item])
 HMF_SPLIT = _rescale(HMF_WEIGHTS, GAP_TARGETS['Heavy Modular Frame'])
 
 
-def _decode_sft(path=SFT_EXPORT):
-    """Decode a Satisfactory Tools .sft export -> top-level dict.
-    Format: first non-blank/non-# line is a version byte + base64(zlib(json))."""
-    line = next(ln for ln in open(path).read().splitlines()
-                if ln.strip() and not ln.startswith('#'))
-    return json.loads(zlib.decompress(base64.b64decode(line[1:])))
-
-
 def _sft_name_maps(db):
     """Build {Desc_*_C suffix: human name} from items.class_name."""
-    suffix = {}
-    for name, cn in db.c.execute('SELECT name, class_name FROM items'):
-        suffix[cn.rsplit('.', 1)[-1]] = name   # trailing Desc_*_C
-    return suffix
+    return db.class_suffix_names()
 
 
 def sft_production_and_inputs(db):
@@ -219,13 +227,12 @@ def sft_production_and_inputs(db):
     human item names. `production_names` = every item appearing in any tab's
     production[] (genuine SET targets). `input_names` = every item in any tab's
     input[] (declared already-supplied)."""
-    data = _decode_sft()
     suffix = _sft_name_maps(db)
 
     def nm(cn):
         return suffix.get(cn, cn)
     prod, inputs = set(), set()
-    for t in data.get('tabs', []):
+    for t in sft_stream.iter_tabs(SFT_EXPORT):
         req = t.get('request', {})
         for p in req.get('production', []):
             prod.add(nm(p['item']))
@@ -377,96 +384,132 @@ def israw(item):
     return item in RAW_SOLID or item in RAW_FLUID
 
 
-def _conv(qty, item):
-    return qty / 1000.0 if item in FLUID_ITEMS else qty
-
-
-class DB:
-    def __init__(self, path):
-        self.c = sqlite3.connect(path)
-        self._cache = {}
-
-    def recipe_io(self, recipe_name):
-        if recipe_name in self._cache:
-            return self._cache[recipe_name]
-        row = self.c.execute("SELECT id,duration FROM recipes WHERE name=?",
-                             (recipe_name,)).fetchone()
-        if not row:
-            raise ValueError(f"recipe not found: {recipe_name!r}")
-        rid, dur = row
-        prod = self.c.execute(
-            "SELECT i.name,rp.quantity FROM recipe_products rp "
-            "JOIN items i ON i.id=rp.item_id WHERE rp.recipe_id=?", (rid,)
-        ).fetchall()
-        ing = self.c.execute(
-            "SELECT i.name,ri.quantity FROM recipe_ingredients ri "
-            "JOIN items i ON i.id=ri.item_id WHERE ri.recipe_id=?", (rid,)
-        ).fetchall()
-        out = {n: _conv(q, n) / dur * 60 for n, q in prod}
-        inp = {n: _conv(q, n) / dur * 60 for n, q in ing}
-        self._cache[recipe_name] = (out, inp)
-        return out, inp
-
-    def recipe_building(self, recipe_name):
-        row = self.c.execute(
-            "SELECT b.name, b.power_used FROM recipes r "
-            "JOIN recipe_buildings rb ON rb.recipe_id=r.id "
-            "JOIN buildings b ON b.id=rb.building_id "
-            "WHERE r.name=?", (recipe_name,)).fetchone()
-        return row if row else (None, 0)
-
-    def default_recipe(self, item):
-        """Non-alternate, building-based recipe where `item` is the primary
-        product; prefer r.name==item; fall back to any alternate. (A8)"""
-        if item in DEFAULT_OVERRIDE:
-            return DEFAULT_OVERRIDE[item]
-        rows = self.c.execute(
-            "SELECT r.name, r.duration, "
-            " (SELECT MAX(rp2.quantity) FROM recipe_products rp2 "
-            "  WHERE rp2.recipe_id=r.id) AS maxq, rp.quantity "
-            "FROM recipes r "
-            "JOIN recipe_products rp ON rp.recipe_id=r.id "
-            "JOIN items i ON i.id=rp.item_id "
-            "JOIN recipe_buildings rb ON rb.recipe_id=r.id "
-            "JOIN buildings b ON b.id=rb.building_id "
-            "WHERE i.name=? AND b.name NOT LIKE '%Converter%' "
-            "  AND b.name NOT LIKE '%Packager%' "
-            "ORDER BY (r.name LIKE 'Alternate:%') ASC, "
-            "         (r.name=?) DESC, "
-            "         (rp.quantity = maxq) DESC, r.name ASC",
-            (item, item)).fetchall()
-        if not rows:
-            raise ValueError(f"no producing recipe for {item!r}")
-        return rows[0][0]
-
-
-def decompose(db, product, rate, pinned, imports, _stack=None, _depth=0):
-    """Backward to raw. Stop at RAW set or declared `imports`. Returns
-    {raw_item: per_min}. Cycle-safe (A7). `pinned` overrides recipe choice."""
-    raw = defaultdict(float)
-    if _stack is None:
-        _stack = set()
-    if rate <= 0 or _depth > 40:
-        return raw
-    if israw(product) or product in imports:
-        raw[product] += rate
-        return raw
-    if product in _stack:                       # cycle break
-        return raw
-    recipe = pinned.get(product) or db.default_recipe(product)
-    out, inp = db.recipe_io(recipe)
-    made = out.get(product)
-    if not made:                                # product only a by-product here
-        raw[product] += rate
-        return raw
-    scale = rate / made
-    _stack = _stack | {product}
-    for ing, per_min in inp.items():
-        sub = decompose(db, ing, per_min * scale, pinned, imports,
-                         _stack, _depth + 1)
-        for k, v in sub.items():
-            raw[k] += v
-    return raw
+def recipe_for(db, item, pinned):
+    """Recipe making `item`: pinned choice, else DEFAULT_OVERRIDE (A8), else
+    the graph's standard recipe."""
+    return (pinned.get(item) or DEFAULT_OVERRIDE.get(item)
+            or db.default_recipe(item))
+
+
+UNIT_CACHE_SIZE = 4096            # per-unit raw vectors kept across pin variants
+
+
+class UnitCache:
+    """Bounded LRU of per-unit raw vectors keyed on (product, frozen pinned,
+    frozen imports), with hit/miss counters for the end-of-run summary."""
+
+    def __init__(self, maxsize=UNIT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._data = OrderedDict()
+        self._graph = None
+
+    def bind(self, graph):
+        """Drop every entry if `graph` is not the recipe graph they were
+        computed from (recipe_graph.load() reloaded a changed DB)."""
+        if graph is not self._graph:
+            self._data.clear()
+            self._graph = graph
+
+    def get(self, key):
+        vec = self._data.get(key)
+        if vec is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._data.move_to_end(key)
+        return vec
+
+    def put(self, key, vec):
+        self._data[key] = vec
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+UNIT_CACHE = UnitCache()
+
+
+class Decomposition:
+    """Recipe-choice matrix for one (pinned, imports) configuration.
+
+    Row `item` lists (ingredient, per-unit rate) for the recipe chosen by
+    recipe_for(); RAW items, `imports` and by-product-only items are boundary
+    columns (no row). Raw demand is linear in rate, so each item's per-unit
+    raw vector is solved once by a post-order sweep and every target is just
+    a scaled copy. Cycle-safe (A7): a back-edge to an item already on the
+    sweep stack contributes nothing, exactly like the old recursive walk.
+    Vectors whose sweep hit such a back-edge depend on the stack they were
+    reached from, so only cycle-free subtrees are memoized (in UNIT_CACHE,
+    shared by every configuration). Unit vectors are exact Fractions, so a
+    scaled result no longer depends on the order the chain's rates were
+    multiplied in."""
+
+    def __init__(self, db, pinned, imports, cache=UNIT_CACHE):
+        self.db, self.pinned, self.imports = db, pinned, imports
+        self.cache = cache
+        self._key = (frozenset(pinned.items()), frozenset(imports))
+        self._rows = {}
+
+    def row(self, item):
+        """[(ingredient, per-unit rate)], or None for a boundary item."""
+        if item in self._rows:
+            return self._rows[item]
+        row = None
+        if not (israw(item) or item in self.imports):
+            out, inp = self.db.recipe_io(recipe_for(self.db, item, self.pinned))
+            made = out.get(item)
+            if made:
+                row = [(ing, Fraction(pm) / Fraction(made))
+                       for ing, pm in inp.items() if pm > 0]
+        self._rows[item] = row
+        return row
+
+    def _sweep(self, item, stack):
+        """-> (per-unit raw vector, True if a cycle break was hit below)."""
+        if item in stack:                           # cycle break
+            return {}, True
+        key = (item,) + self._key
+        vec = self.cache.get(key)
+        if vec is not None:
+            return vec, False
+        row = self.row(item)
+        if row is None:
+            vec = {item: Fraction(1)}
+            self.cache.put(key, vec)
+            return vec, False
+        stack.add(item)
+        vec, cyclic = {}, False
+        for ing, k in row:
+            sub, sub_cyclic = self._sweep(ing, stack)
+            cyclic = cyclic or sub_cyclic
+            for raw, v in sub.items():
+                vec[raw] = vec.get(raw, 0) + v * k
+        stack.discard(item)
+        if not cyclic:
+            self.cache.put(key, vec)
+        return vec, cyclic
+
+    def unit(self, item):
+        """{raw_item: Fraction} needed per 1/min of `item`."""
+        return self._sweep(item, set())[0]
+
+    def solve(self, targets):
+        """Backward to raw for a whole {product: rate} batch. Stops at RAW or
+        `imports`; returns {product: {raw_item: per_min}}."""
+        return {p: ({raw: float(v * Fraction(rate))
+                     for raw, v in self.unit(p).items()}
+                    if rate > 0 else {})
+                for p, rate in targets.items()}
+
+
+def decomposition(db, pinned, imports):
+    """Decomposition for this configuration. Cheap: rows are compiled lazily
+    and only on UNIT_CACHE misses."""
+    return Decomposition(db, pinned, imports)
 
 
 # ---------------------------------------------------------------- pool / occ
@@ -478,24 +521,209 @@ def quadrant(x, y):
     return ('N' if y < 0 else 'S') + ('W' if x < 0 else 'E')
 
 
+GRID_CELL = SEARCH_RADIUS        # spatial index bucket edge (game units)
+
+
+class PoolNode:
+    """One pool row, subscripted like the node dicts the pool used to hold
+    (n['x'], n['type'], n['reserved_by'], ...). Read-only: reserve through
+    NodePool.reserve(). One view per row, so identity and `in` still work."""
+
+    __slots__ = ('pool', 'i')
+
+    def __init__(self, pool, i):
+        self.pool, self.i = pool, i
+
+    def __getitem__(self, key):
+        return self.pool._get[key](self.i)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self):
+        return repr({k: self[k] for k in self.pool._get})
+
+
+class NodePool(list):
+    """The node/well pool, in file order, stored as parallel columns (type,
+    purity and kind as byte codes; x, y, core, path; the `reserved_by` owner
+    column) and exposed as PoolNode views, plus a uniform-grid spatial index
+    keyed by type and reservation status. Radius and nearest-k queries touch
+    only the grid cells that can hold a hit, and every answer comes back in
+    POOL ORDER so scores, centroids and tie-breaks are identical to a full
+    linear scan.
+
+    Reserve nodes ONLY through reserve(): it keeps the free-node buckets in
+    step, appends newly reserved nodes to `changes` (the log incremental
+    scorers such as CenterScores replay) and records the previous owner in an
+    undo log, so checkpoint()/rollback() restore any earlier state in
+    O(reservations since) — what-if allocations need no reload or copy."""
+
+    def __init__(self, rows, cell=GRID_CELL):
+        super().__init__()
+        self.cell = cell
+        self.types, self.purities, self.kinds = [], [], []    # code -> name
+        self.type_code, self.purity_code, self.kind_code = (
+            array('B'), array('B'), array('B'))
+        self.xs, self.ys, self.cores, self.paths, self.owner = \
+            [], [], [], [], []
+        for r in rows:
+            self.type_code.append(self._code(self.types, r['type']))
+            self.purity_code.append(self._code(self.purities, r['purity']))
+            self.kind_code.append(self._code(self.kinds, r['kind']))
+            self.xs.append(r['x'])
+            self.ys.append(r['y'])
+            self.cores.append(r['core'])
+            self.paths.append(r['path'])
+            self.owner.append(r.get('reserved_by'))
+        self.extend(PoolNode(self, i) for i in range(len(self.xs)))
+        types, purities, kinds = self.types, self.purities, self.kinds
+        tc, pc, kc = self.type_code, self.purity_code, self.kind_code
+        self._get = {'type': lambda i: types[tc[i]],
+                     'purity': lambda i: purities[pc[i]],
+                     'x': self.xs.__getitem__, 'y': self.ys.__getitem__,
+                     'kind': lambda i: kinds[kc[i]],
+                     'core': self.cores.__getitem__,
+                     'path': self.paths.__getitem__,
+                     'reserved_by': self.owner.__getitem__}
+        self.type_counts = defaultdict(int)
+        self._cells = defaultdict(list)           # (type, cx, cy) -> [i], all
+        self._free = defaultdict(list)            # (type|None, cx, cy) -> [i]
+        self._free_n = defaultdict(int)           # type -> unreserved count
+        self._cores = defaultdict(list)           # well core -> [i]
+        self.changes = []                         # nodes reserved, in order
+        self._undo = []                           # (i, previous owner)
+        self.generation = 0                       # bumped by rollback()
+        for i in range(len(self)):
+            ntype = types[tc[i]]
+            self.type_counts[ntype] += 1
+            cx, cy = self._cell_of(self.xs[i], self.ys[i])
+            self._cells[(ntype, cx, cy)].append(i)
+            if kinds[kc[i]] == 'well' and self.cores[i]:
+                self._cores[self.cores[i]].append(i)
+            if self.owner[i] is None:
+                self._free[(ntype, cx, cy)].append(i)
+                self._free[(None, cx, cy)].append(i)
+                self._free_n[ntype] += 1
+
+    @staticmethod
+    def _code(table, name):
+        if name not in table:
+            table.append(name)
+        return table.index(name)
+
+    def _cell_of(self, x, y):
+        return math.floor(x / self.cell), math.floor(y / self.cell)
+
+    def reserve(self, node, owner):
+        """Set node['reserved_by'] = owner and drop it from the free buckets."""
+        i = node.i
+        prev = self.owner[i]
+        if prev is None:
+            ntype = self.types[self.type_code[i]]
+            cx, cy = self._cell_of(self.xs[i], self.ys[i])
+            self._free[(ntype, cx, cy)].remove(i)
+            self._free[(None, cx, cy)].remove(i)
+            self._free_n[ntype] -= 1
+            self.changes.append(node)
+        self._undo.append((i, prev))
+        self.owner[i] = owner
+
+    def checkpoint(self):
+        """Opaque mark of the current reservation state, for rollback()."""
+        return len(self._undo)
+
+    def rollback(self, mark):
+        """Undo every reserve() made since checkpoint() returned `mark`."""
+        while len(self._undo) > mark:
+            i, prev = self._undo.pop()
+            if prev is None:
+                ntype = self.types[self.type_code[i]]
+                cx, cy = self._cell_of(self.xs[i], self.ys[i])
+                bisect.insort(self._free[(ntype, cx, cy)], i)
+                bisect.insort(self._free[(None, cx, cy)], i)
+                self._free_n[ntype] += 1
+                self.changes.pop()
+            self.owner[i] = prev
+        self.generation += 1
+
+    def index(self, node):
+        return node.i
+
+    def free(self, ntype):
+        """Unreserved nodes of `ntype`, pool order."""
+        hits = sorted(i for key, ids in self._free.items()
+                      if key[0] == ntype for i in ids)
+        return [self[i] for i in hits]
+
+    def free_count(self, ntype):
+        return self._free_n.get(ntype, 0)
+
+    def core_group(self, core):
+        """Unreserved wells sharing satellite `core`, pool order."""
+        return [self[i] for i in self._cores.get(core, ())
+                if self.owner[i] is None]
+
+    def within(self, pt, radius, ntype=None, free=True):
+        """Nodes with dist(pt, node) <= radius, pool order. `ntype` None = any
+        type (free nodes only); `free=False` includes reserved nodes."""
+        buckets = self._free if free else self._cells
+        assert free or ntype is not None
+        x0, y0 = self._cell_of(pt[0] - radius, pt[1] - radius)
+        x1, y1 = self._cell_of(pt[0] + radius, pt[1] + radius)
+        hits = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                hits.extend(buckets.get((ntype, cx, cy), ()))
+        hits.sort()
+        xs, ys = self.xs, self.ys
+        return [self[i] for i in hits if dist(pt, (xs[i], ys[i])) <= radius]
+
+    def nearest(self, pt, ntype, k=1, free=True):
+        """Up to k (distance, node) pairs of `ntype` nearest `pt`, closest
+        first (pool order on ties). Grows a square ring of cells until the
+        k-th hit is provably closer than anything outside the ring."""
+        buckets = self._free if free else self._cells
+        # .get: a read-only query must not add zero entries to the defaultdicts
+        total = (self._free_n if free else self.type_counts).get(ntype, 0)
+        k = min(k, total)
+        if k <= 0:
+            return []
+        xs, ys = self.xs, self.ys
+        cx, cy = self._cell_of(*pt)
+        found, ring = [], 0
+        while True:
+            for gx in range(cx - ring, cx + ring + 1):
+                for gy in range(cy - ring, cy + ring + 1):
+                    if max(abs(gx - cx), abs(gy - cy)) != ring:
+                        continue
+                    for i in buckets.get((ntype, gx, gy), ()):
+                        found.append((dist(pt, (xs[i], ys[i])), i))
+            # every node outside the ring is > ring * cell away from pt
+            if len(found) >= k:
+                found.sort()
+                if found[k - 1][0] < ring * self.cell or len(found) == total:
+                    return [(d, self[i]) for d, i in found[:k]]
+            ring += 1
+
+
 def load_pool():
-    """Load resource_nodes AND resource_wells (A1). Each entry mutable with
-    reserved_by; wells carry `core` (reservation/non-overlap unit)."""
+    """Load resource_nodes AND resource_wells (A1) into a NodePool. Every row
+    starts unreserved; wells carry `core` (reservation/non-overlap unit)."""
     data = json.load(open(RESOURCE_NODES))
-    pool = []
-    for n in data['resource_nodes']:
-        pool.append({'type': n['type'], 'purity': n['purity'],
-                     'x': n['x'], 'y': n['y'], 'kind': 'node',
-                     'core': None, 'path': n.get('path_name', ''),
-                     'reserved_by': None})
-    for w in data['resource_wells']:
-        if not w.get('type'):
-            continue
-        pool.append({'type': w['type'], 'purity': w['purity'],
-                     'x': w['x'], 'y': w['y'], 'kind': 'well',
-                     'core': w.get('core') or w.get('path_name'),
-                     'path': w.get('path_name', ''), 'reserved_by': None})
-    return pool
+    rows = [{'type': n['type'], 'purity': n['purity'],
+             'x': n['x'], 'y': n['y'], 'kind': 'node',
+             'core': None, 'path': n.get('path_name', '')}
+            for n in data['resource_nodes']]
+    rows += [{'type': w['type'], 'purity': w['purity'],
+              'x': w['x'], 'y': w['y'], 'kind': 'well',
+              'core': w.get('core') or w.get('path_name'),
+              'path': w.get('path_name', '')}
+             for w in data['resource_wells'] if w.get('type')]
+    return NodePool(rows)
 
 
 # Live nodes the user marked REUSE-ELIGIBLE in the Occupied Nodes picker
@@ -530,9 +758,8 @@ def mark_occupied(pool):
             released += 1
             continue                       # user freed this node -> leave available
         ntype = OCC_NAME_MAP.get(rec.get('resource'), '')
-        same = [n for n in pool if n['type'] == ntype]
-        nd = min((dist((p[0], p[1]), (n['x'], n['y'])) for n in same),
-                 default=math.inf)
+        hit = pool.nearest((p[0], p[1]), ntype, free=False)
+        nd = hit[0][0] if hit else math.inf
         recs.append((nd, (p[0], p[1], ntype), rec))
     # nearest-match-first: exact hits (real miners sit on their node) claim
     # their own node before greedy cascades can steal it.
@@ -545,14 +772,12 @@ def mark_occupied(pool):
             continue
         px, py, ntype = key
         best, bd = None, OCC_MATCH_TOL
-        for n in pool:
-            if n['reserved_by'] is not None or n['type'] != ntype:
-                continue
+        for n in pool.within((px, py), OCC_MATCH_TOL, ntype):
             d = dist((px, py), (n['x'], n['y']))
             if d <= bd:
                 best, bd = n, d
         if best:
-            best['reserved_by'] = '__occupied__'
+            pool.reserve(best, '__occupied__')
             matched += 1
         else:
             unmatched.append((rec.get('resource'), round(px), round(py)))
@@ -562,7 +787,7 @@ def mark_occupied(pool):
 
 
 def avail(pool, ntype):
-    return [n for n in pool if n['reserved_by'] is None and n['type'] == ntype]
+    return pool.free(ntype)
 
 
 def rate_of(node):
@@ -593,9 +818,10 @@ def claim_nearest(pool, ntype, center, demand, job_id, radius=None):
     """Single distance-first policy (A5), used for BOTH counting and
     reservation. Wells reserve by whole `core` (A1). Returns
     (claimed_nodes, capacity)."""
-    cand = avail(pool, ntype)
     if radius is not None:
-        cand = [n for n in cand if dist(center, (n['x'], n['y'])) <= radius]
+        cand = pool.within(center, radius, ntype)
+    else:
+        cand = avail(pool, ntype)
     # Distance-first, but within a ~PURE_PREF_BUCKET band prefer higher purity
     # so PURE nodes get used preferentially for real demand (soft, not forced).
     cand.sort(key=lambda n: (round(dist(center, (n['x'], n['y'])) / PURE_PREF_BUCKET),
@@ -610,10 +836,9 @@ def claim_nearest(pool, ntype, center, demand, job_id, radius=None):
             continue
         group = [n]
         if n['kind'] == 'well' and n['core']:
-            group = [m for m in pool if m['reserved_by'] is None
-                     and m['kind'] == 'well' and m['core'] == n['core']]
+            group = pool.core_group(n['core'])
         for m in group:
-            m['reserved_by'] = job_id
+            pool.reserve(m, job_id)
             claimed.append(m)
             cap += rate_of(m)
     return claimed, cap
@@ -621,18 +846,7 @@ def claim_nearest(pool, ntype, center, demand, job_id, radius=None):
 
 def cluster(nodes, radius):
     """Single-linkage clustering at `radius` (A11) -> list of node lists."""
-    clusters = []
-    for n in nodes:
-        placed = False
-        for cl in clusters:
-            if any(dist((n['x'], n['y']), (m['x'], m['y'])) <= radius
-                   for m in cl):
-                cl.append(n)
-                placed = True
-                break
-        if not placed:
-            clusters.append([n])
-    return clusters
+    return clustering.single_linkage(nodes, radius)
 
 
 def centroid(nodes):
@@ -671,15 +885,15 @@ def job_raw_demand(db, fid, products, pinned, imports):
     """{node_type: per_min} for mined solids + oil + nitrogenGas. Decomposes
     each FINAL product end-to-end (A7); Water dropped (sited-anywhere)."""
     agg = defaultdict(float)
-    for item, mode in products.items():
-        rate = _rate(item, mode, fid)
-        for raw, pm in decompose(db, item, rate, pinned, imports).items():
+    targets = _resolved_products(products, fid)
+    for vec in decomposition(db, pinned, imports).solve(targets).values():
+        for raw, pm in vec.items():
             if raw == 'Water':
                 continue
             nt = ITEM_TO_NODETYPE.get(raw)
             if nt:
                 agg[nt] += pm
-    return dict(agg), {p: _rate(p, m, fid) for p, m in products.items()}
+    return dict(agg), targets
 
 
 def aldercast_imports(db):
@@ -688,10 +902,10 @@ def aldercast_imports(db):
     quantities instead of dropping them."""
     f = NEW_FACTORIES['aldercast']
     need = defaultdict(float)
-    for item, mode in f['products'].items():
-        rate = split_rate(item, 'aldercast')
-        for raw, pm in decompose(db, item, rate, f['recipes'],
-                                 f['imports']).items():
+    targets = {item: split_rate(item, 'aldercast') for item in f['products']}
+    plan = decomposition(db, f['recipes'], f['imports'])
+    for vec in plan.solve(targets).values():
+        for raw, pm in vec.items():
             if raw in f['imports']:
                 need[raw] += pm
     return dict(need)
@@ -719,12 +933,11 @@ def factory_consumption_of(db, fid, products, pinned, target_item):
     """How much of target_item factory fid consumes (per min), assuming
     in-house all the way down except target_item which is treated as a
     boundary (its consumption is the value we want)."""
+    targets = {item: split_rate(item, fid) if mode[0] == 'split'
+               else GAP_TARGETS[item] for item, mode in products.items()}
     total = 0.0
-    for item, mode in products.items():
-        rate = split_rate(item, fid) if mode[0] == 'split' else GAP_TARGETS[item]
-        for raw, pm in decompose(db, item, rate, pinned, {target_item}).items():
-            if raw == target_item:
-                total += pm
+    for vec in decomposition(db, pinned, {target_item}).solve(targets).values():
+        total += vec.get(target_item, 0.0)
     return total
 
 
@@ -779,7 +992,7 @@ def building_chain(db, products, pinned, imports):
         if item in visited or israw(item) or item in imports:
             continue
         visited.add(item); order.append(item)
-        recipe = pinned.get(item) or db.default_recipe(item)
+        recipe = recipe_for(db, item, pinned)
         out, inp = db.recipe_io(recipe)
         made = out.get(item, 0)
         if not made: continue
@@ -790,7 +1003,7 @@ def building_chain(db, products, pinned, imports):
     # phase 2: build entries
     entries = []
     for item in order:
-        recipe = pinned.get(item) or db.default_recipe(item)
+        recipe = recipe_for(db, item, pinned)
         out, inp = db.recipe_io(recipe)
         made = out.get(item, 0)
         if not made: continue
@@ -839,32 +1052,48 @@ def base_rate(node):
     return MINER_RATE[pur] / 2.5
 
 
+_SHARD_TABLES = {}               # (kind, type, purity) -> (rate@0, gains)
+
+
+def shard_table(node):
+    """(rate at 0 shards, (gain of shard 1, 2, 3)) for a full or compact node
+    dict. Rates depend only on kind/type/purity, so each class is worked out
+    once with effective_at_shards() and shared."""
+    key = (node.get('kind') or node.get('k'), node.get('type') or node.get('t'),
+           node.get('purity') or node.get('p'))
+    if key not in _SHARD_TABLES:
+        rates = [effective_at_shards(node, s) for s in range(4)]
+        _SHARD_TABLES[key] = (rates[0], tuple(rates[s + 1] - rates[s]
+                                              for s in range(3)))
+    return _SHARD_TABLES[key]
+
+
 def site_min_overclock(nodes, demand):
     """Pick the minimum overclock per node such that Σ effective_rate >=
     demand, respecting belt cap (no shard wasted past 780/min). Greedy:
     each round pick the node where the NEXT shard adds the most effective
-    rate. Returns ({nid: {'clock', 'shards'}}, total_shards, cap_now)."""
+    rate (first node on ties) — a max-heap of each node's next gain from
+    its precomputed table, so a shard costs O(log n), not a rescan.
+    Returns ({nid: {'clock', 'shards'}}, total_shards, cap_now)."""
     if not nodes:
         return {}, 0, 0.0
     state = {id(n): {'clock': 100, 'shards': 0} for n in nodes}
-    total = sum(effective_at_shards(n, 0) for n in nodes)
+    tables = [shard_table(n) for n in nodes]
+    total = sum(base for base, _ in tables)
+    heap = [(-gains[0], k) for k, (_, gains) in enumerate(tables)]
+    heapq.heapify(heap)
     total_shards = 0
-    while total + 1e-6 < demand:
-        # rank by marginal gain of one more shard
-        best, best_gain = None, 0
-        for n in nodes:
-            s = state[id(n)]['shards']
-            if s >= 3:
-                continue
-            gain = effective_at_shards(n, s + 1) - effective_at_shards(n, s)
-            if gain > best_gain:
-                best, best_gain = n, gain
-        if best is None or best_gain <= 1e-6:
+    while total + 1e-6 < demand and heap:
+        neg, k = heapq.heappop(heap)
+        if -neg <= 1e-6:
             break        # no more useful shards (belt-capped) or all maxed
-        state[id(best)]['shards'] += 1
-        state[id(best)]['clock'] = 100 + 50 * state[id(best)]['shards']
-        total += best_gain
+        s = state[id(nodes[k])]
+        s['shards'] += 1
+        s['clock'] = 100 + 50 * s['shards']
+        total += -neg
         total_shards += 1
+        if s['shards'] < 3:
+            heapq.heappush(heap, (-tables[k][1][s['shards']], k))
     return state, total_shards, round(total, 1)
 
 
@@ -888,15 +1117,12 @@ def score_centers(pool, sig, sig_demand, placed_centers, home=None,
         return []
     match_types = set(demand_types) if demand_types else set()
     match_types.add(sig)
-    counts = defaultdict(int)
-    for n in pool:
-        counts[n['type']] += 1
+    counts = pool.type_counts
     max_count = max(counts.values())
     rarity = (max_count / max(counts.get(sig, 1), 1)) ** 1.5
     out = []
     for c in sig_nodes:
-        near = [n for n in sig_nodes
-                if dist((c['x'], c['y']), (n['x'], n['y'])) <= SEARCH_RADIUS]
+        near = pool.within((c['x'], c['y']), SEARCH_RADIUS, sig)
         if not near:
             continue
         ctr = centroid(near)
@@ -910,8 +1136,7 @@ def score_centers(pool, sig, sig_demand, placed_centers, home=None,
         # Pocket-match: fraction of all unreserved local nodes that are the
         # job's own ore. Blended toward 1.0 by POCKET_MATCH_WEIGHT and floored
         # so a sparse-signature job is penalized, not eliminated.
-        local_all = [n for n in pool if n['reserved_by'] is None
-                     and dist(ctr, (n['x'], n['y'])) <= SEARCH_RADIUS]
+        local_all = pool.within(ctr, SEARCH_RADIUS)
         if local_all:
             frac = sum(1 for n in local_all if n['type'] in match_types) \
                 / len(local_all)
@@ -930,6 +1155,103 @@ def score_centers(pool, sig, sig_demand, placed_centers, home=None,
     return out
 
 
+class CenterScores:
+    """Incremental score_centers() (home=None) for one signature + pocket-match
+    type set, kept across allocate() phase-1 rounds.
+
+    Each candidate's demand-independent parts (purity sum, quadrant weight,
+    pocket-match factor, centroid, cluster) are cached and kept in a max-heap.
+    best() replays pool.changes since the last call and rescores only the
+    candidates within 2*SEARCH_RADIUS of a newly reserved node: the cluster
+    (R around the candidate) and the pocket (R around its centroid, itself
+    within R) cannot see anything farther. The MIN_SEPARATION exclusion is
+    checked lazily as candidates surface, against the live placed_centers.
+    The winner is re-scored with score_centers' exact arithmetic and
+    tie-break, so the pick is identical to ranked[0]. A pool rollback()
+    invalidates the replay cursor, so the next best() rebuilds from scratch."""
+
+    def __init__(self, pool, sig, match_types):
+        self.pool, self.sig, self.match_types = pool, sig, set(match_types)
+        counts = pool.type_counts
+        self.rarity = (max(counts.values()) / max(counts.get(sig, 1), 1)) ** 1.5
+        self._reset()
+
+    def _reset(self):
+        self.parts = {}                           # pool idx -> cached parts
+        self.ver = defaultdict(int)               # pool idx -> heap version
+        self.heap = []
+        self.cursor = len(self.pool.changes)
+        self.generation = self.pool.generation
+        for c in self.pool.free(self.sig):
+            self._rescore(self.pool.index(c))
+
+    def _rescore(self, i):
+        self.ver[i] += 1
+        self.parts.pop(i, None)
+        c = self.pool[i]
+        if c['reserved_by'] is not None:
+            return
+        near = self.pool.within((c['x'], c['y']), SEARCH_RADIUS, self.sig)
+        ctr = centroid(near)
+        purity = sum(PURITY_WEIGHT[n['purity']] for n in near)
+        local_all = self.pool.within(ctr, SEARCH_RADIUS)
+        if local_all:
+            frac = sum(1 for n in local_all if n['type'] in self.match_types) \
+                / len(local_all)
+        else:
+            frac = 1.0
+        frac = max(frac, POCKET_MATCH_FLOOR)
+        pocket = (1.0 - POCKET_MATCH_WEIGHT) + POCKET_MATCH_WEIGHT * frac
+        qw = QUADRANT_WEIGHT.get(quadrant(*ctr), 1.0)
+        self.parts[i] = (purity, qw, pocket, ctr, near, c['path'])
+        heapq.heappush(self.heap, (-purity * self.rarity * qw * pocket,
+                                   c['path'], i, self.ver[i]))
+
+    def _sync(self):
+        if self.generation != self.pool.generation:
+            self._reset()
+            return
+        dirty = set()
+        for n in self.pool.changes[self.cursor:]:
+            for c in self.pool.within((n['x'], n['y']), 2 * SEARCH_RADIUS,
+                                      self.sig, free=False):
+                dirty.add(self.pool.index(c))
+        self.cursor = len(self.pool.changes)
+        for i in sorted(dirty):
+            if i in self.parts or self.pool[i]['reserved_by'] is None:
+                self._rescore(i)
+
+    def best(self, sig_demand, placed_centers, skip=0):
+        """score_centers(...)[skip] for this demand (clamped to the last
+        candidate), or None."""
+        self._sync()
+        top, popped = [], []                      # [(key, pick)], best first
+        while self.heap:
+            neg, path, i, v = self.heap[0]
+            if v != self.ver[i] or i not in self.parts:
+                heapq.heappop(self.heap)              # stale entry
+                continue
+            purity, qw, pocket, ctr, near, _ = self.parts[i]
+            if any(dist(ctr, pc) < MIN_SEPARATION * 1.25
+                   for pc in placed_centers):
+                heapq.heappop(self.heap)              # excluded for good
+                del self.parts[i]
+                continue
+            # heap order is exact up to float noise << the 3-decimal rounding
+            if len(top) > skip and -neg * sig_demand < -top[-1][0][0] - 1e-3:
+                break
+            popped.append(heapq.heappop(self.heap))
+            sc = purity * sig_demand * self.rarity
+            sc *= qw
+            sc *= pocket
+            key = (-round(sc, 3), path)
+            bisect.insort(top, (key, (round(sc, 3), ctr, near, path)))
+            del top[skip + 1:]
+        for e in popped:
+            heapq.heappush(self.heap, e)
+        return top[min(skip, len(top) - 1)][1] if top else None
+
+
 def alloc_signature(pool, job, placed_centers, home=None):
     """Claim signature sites for one job: best cluster, spill to satellites
     up to MAX_SITES. Mutates pool/placed_centers. Sets job sites/infeasible.
@@ -1073,9 +1395,7 @@ def consolidate_mining_towns(pool, jobs, placed_centers):
                 break
             best, best_cap, best_ctr = None, -1, None
             for c in avail_r:
-                near = [n for n in avail_r
-                        if dist((c['x'], c['y']),
-                                (n['x'], n['y'])) <= SEARCH_RADIUS]
+                near = pool.within((c['x'], c['y']), SEARCH_RADIUS, r)
                 if len(near) < min_nodes:
                     continue
                 ctr = centroid(near)
@@ -1302,20 +1622,19 @@ def build_jobs(db, extras=None):
 
 
 def pressure_key(pool, job):
-    counts = defaultdict(int)
-    for n in pool:
-        if n['reserved_by'] is None:
-            counts[n['type']] += 1
     best = math.inf
     for nt, dmd in job['raw_demand'].items():
         if dmd <= 0:
             continue
-        best = min(best, counts.get(nt, 0) / math.sqrt(dmd))
+        best = min(best, pool.free_count(nt) / math.sqrt(dmd))
     tonnage = sum(job['raw_demand'].values())
     return (best, -tonnage)
 
 
-def allocate(pool, jobs):
+def allocate(pool, jobs, plan=None):
+    # `plan` (optimizer, optional): {'order': [job id], 'skip': {job id: n}}
+    # replaces the pressure order and takes the n-th best primary center for
+    # the listed `new` jobs instead of the best. None = the greedy allocation.
     placed_centers = []
     # Pre-seed anchored (ext/hmf) job centers: they sit at FIXED existing
     # in-game factory locations and cannot move, so seeding them up front makes
@@ -1325,9 +1644,16 @@ def allocate(pool, jobs):
     anchored_seed = [(j['anchor']['x'], j['anchor']['y'])
                      for j in jobs if j.get('anchor')]
     placed_centers.extend(anchored_seed)
-    pending = sorted(jobs, key=lambda j: pressure_key(pool, j))
+    if plan is None:
+        pending = sorted(jobs, key=lambda j: pressure_key(pool, j))
+        skips = {}
+    else:
+        rank = {fid: k for k, fid in enumerate(plan['order'])}
+        pending = sorted(jobs, key=lambda j: rank[j['id']])
+        skips = plan['skip']
     done = set()
     order = []
+    scorers = {}                    # (signature, match types) -> CenterScores
     # PHASE 1 — reserve ALL signature sites first (B1: a trained grab must
     # never starve a later job's signature resource).
     for j in pending:
@@ -1345,13 +1671,17 @@ def allocate(pool, jobs):
             rounds = 0
             while active and rounds < MAX_SITES:
                 for p in list(active):
-                    ranked = score_centers(pool, p['signature'],
-                                           p['remaining'], placed_centers,
-                                           demand_types=set(p['raw_demand']))
-                    if not ranked:
+                    types = frozenset(p['raw_demand']) | {p['signature']}
+                    if (p['signature'], types) not in scorers:
+                        scorers[(p['signature'], types)] = CenterScores(
+                            pool, p['signature'], types)
+                    top = scorers[(p['signature'], types)].best(
+                        p['remaining'], placed_centers,
+                        0 if p['sites'] else skips.get(p['id'], 0))
+                    if top is None:
                         active.remove(p)
                         continue
-                    _, ctr, _, _ = ranked[0]
+                    _, ctr, _, _ = top
                     claimed, cap = claim_nearest(pool, p['signature'], ctr,
                                                  p['remaining'], p['id'],
                                                  radius=SEARCH_RADIUS)
@@ -1568,9 +1898,11 @@ def validate(out, pool, order, unmatched):
     return issues, (total, occ, res, free)
 
 
-def inject_map(out):
-    """Rewrite the // <GAP_DATA> ... // </GAP_DATA> block in factory-map.html
-    with a compact GAP_FACTORIES array (Task 7; idempotent)."""
+def write_map_data(out):
+    """Write the compact GAP_FACTORIES / GAP_TOWNS records factory-map.html
+    draws to gap-map-data.<hash>.json (hash of the content, so the server can
+    cache it forever) and point gap-map-data.json at it. The page itself is
+    never rewritten; unchanged data keeps its file and URL."""
     arr = []
     for fid, f in out['factory_locations'].items():
         bt = f.get('building_totals') or {}
@@ -1612,28 +1944,273 @@ def inject_map(out):
             'nodes': t['nodes'],
             'supplies': t.get('supplies', []),
         })
-    js = ('// <GAP_DATA> — rewritten by find_gap_factory_locations.py; '
-          'do not hand-edit\nconst GAP_FACTORIES = '
-          + json.dumps(arr, separators=(',', ':')) + ';\n'
-          + 'const GAP_TOWNS = '
-          + json.dumps(towns, separators=(',', ':')) + ';\n'
-          + '// </GAP_DATA>')
-    html = open(MAP_HTML, encoding='utf-8').read()
-    new = re.sub(r'// <GAP_DATA>.*?// </GAP_DATA>', lambda _: js, html,
-                 count=1, flags=re.DOTALL)
-    if new == html and '// <GAP_DATA>' not in html:
-        raise RuntimeError("GAP_DATA markers not found in factory-map.html")
-    open(MAP_HTML, 'w', encoding='utf-8').write(new)
-    # parse-check both injected literals (A10/Task7 Step7)
-    m1 = re.search(r'const GAP_FACTORIES = (\[.*?\]);', new, re.DOTALL)
-    m2 = re.search(r'const GAP_TOWNS = (\[.*?\]);', new, re.DOTALL)
-    json.loads(m1.group(1))
-    json.loads(m2.group(1))
+    body = json.dumps(node_columns.encode(
+        {'schema': MAP_DATA_SCHEMA, 'factories': arr, 'towns': towns}),
+        separators=(',', ':')).encode()
+    version = hashlib.sha1(body).hexdigest()[:12]
+    stem = os.path.splitext(MAP_DATA)[0]
+    data_file = f'{stem}.{version}.json'
+    if not os.path.exists(data_file):
+        with open(data_file + '.tmp', 'wb') as f:
+            f.write(body)
+        os.replace(data_file + '.tmp', data_file)
+    # pointer last: readers never see a version whose file isn't there yet
+    with open(MAP_DATA + '.tmp', 'w') as f:
+        json.dump({'schema': MAP_DATA_SCHEMA, 'version': version,
+                   'data': data_file, 'factories': len(arr),
+                   'towns': len(towns)}, f, indent=1)
+    os.replace(MAP_DATA + '.tmp', MAP_DATA)
+    for old in glob.glob(f'{stem}.*.json'):
+        if old != data_file:
+            os.remove(old)
     return len(arr), len(towns)
 
 
-def main():
-    db = DB(DB_PATH)
+# ---------------------------------------------------------------- sweep
+SWEEP_BOUNDS = {                 # tunable parameter -> accepted (min, max)
+    'SEARCH_RADIUS': (10_000, 200_000),
+    'MIN_SEPARATION': (0, 100_000),
+    'LOCAL_PENALTY_EXP': (0.0, 8.0),
+    'POCKET_MATCH_WEIGHT': (0.0, 1.0),   # blend weight: 0 off, 1 full
+}
+SWEEP_PARAMS = tuple(SWEEP_BOUNDS)
+_SWEEP_BASE = None               # (occupied pool, jobs), set pre-fork
+
+
+def sweep_value(name, value):
+    """`value` for tunable `name`, cast to the module constant's type.
+    ValueError if `name` is not in SWEEP_PARAMS, `value` is outside its
+    SWEEP_BOUNDS, or it is fractional for an integer constant."""
+    if name not in SWEEP_BOUNDS:
+        raise ValueError(f"unknown parameter {name}; "
+                         f"expected {', '.join(SWEEP_PARAMS)}")
+    lo, hi = SWEEP_BOUNDS[name]
+    v = float(value)
+    if not lo <= v <= hi:
+        raise ValueError(f"{name} must be within {lo}..{hi}, got {value}")
+    if isinstance(globals()[name], int):
+        if not v.is_integer():
+            raise ValueError(f"{name} must be a whole number, got {value}")
+        return int(v)
+    return v
+
+
+def parse_sweep(specs):
+    """['SEARCH_RADIUS=60000,70000', ...] -> [{param: value}, ...], the full
+    cartesian grid (parameters not named keep their module value)."""
+    axes = []
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        name = name.strip().upper()
+        if name not in SWEEP_PARAMS or not values:
+            raise SystemExit(f"--sweep {spec!r}: expected PARAM=V1,V2,... "
+                             f"with PARAM in {', '.join(SWEEP_PARAMS)}")
+        try:
+            axes.append([(name, sweep_value(name, v))
+                         for v in values.split(',') if v.strip()])
+        except ValueError as e:
+            raise SystemExit(f"--sweep {spec!r}: {e}") from None
+    return [dict(combo) for combo in itertools.product(*axes)]
+
+
+def haul_distance(order, towns):
+    """Straight-line hauling (game units) the plan implies: every extra site
+    and trained outpost to its factory's home (first site, else anchor), plus
+    every mining-town supply leg to its consumer."""
+    homes, total = {}, 0.0
+    for j in order:
+        home = j['sites'][0]['center'] if j.get('sites') else \
+            (j.get('anchor') or {'x': 0, 'y': 0})
+        home = homes[j['id']] = (home['x'], home['y'])
+        for far in j.get('sites', [])[1:] + j.get('outposts', []):
+            total += dist(home, (far['center']['x'], far['center']['y']))
+    for t in towns:
+        for s in t.get('supplies', []):
+            total += dist((t['center']['x'], t['center']['y']),
+                          homes.get(s['factory'], (0, 0)))
+    return total
+
+
+def sweep_metrics(order, towns):
+    return {'haul': haul_distance(order, towns),
+            'infeasible': sum(1 for j in order if j.get('infeasible')),
+            'shards': (sum(j.get('total_shards', 0) for j in order)
+                       + sum(t.get('shards', 0) for t in towns)),
+            'sites': sum(len(j.get('sites', [])) for j in order)}
+
+
+def _sweep_one(params):
+    """allocate() one parameter combination on a private copy of the base
+    jobs; the pool is rolled back and module constants restored afterwards."""
+    pool, jobs = _SWEEP_BASE
+    saved = {k: globals()[k] for k in params}
+    globals().update(params)
+    mark = pool.checkpoint()
+    try:
+        order, _, towns = allocate(pool, copy.deepcopy(jobs))
+        return params, sweep_metrics(order, towns)
+    finally:
+        pool.rollback(mark)
+        globals().update(saved)
+
+
+def sweep(specs, jobs=1):
+    """Run allocate() for every combination of --sweep values and print one
+    metrics row each. Demand decomposition and occupancy are done once and
+    inherited by fork()ed workers; nothing is written."""
+    global _SWEEP_BASE
+    grid = parse_sweep(specs)
+    db = recipe_graph.load(DB_PATH)
+    pool = load_pool()
+    mark_occupied(pool)
+    extras, _ = resolve_imports(db, load_current_production())
+    _SWEEP_BASE = (pool, build_jobs(db, extras))
+    jobs = min(jobs or os.cpu_count() or 1, len(grid))
+    if jobs <= 1:
+        results = [_sweep_one(p) for p in grid]
+    else:
+        with multiprocessing.get_context('fork').Pool(jobs) as workers:
+            results = list(workers.imap(_sweep_one, grid))
+    names = [k for k in SWEEP_PARAMS if any(k in p for p in grid)]
+    print('  '.join(f'{k:>19}' for k in names)
+          + f"  {'haul(k)':>9} {'infeasible':>10} {'shards':>6} {'sites':>5}")
+    for params, m in results:
+        print('  '.join(f'{params[k]:>19}' for k in names)
+              + f"  {m['haul'] / 1000:9.0f} {m['infeasible']:10} "
+              f"{m['shards']:6} {m['sites']:5}")
+
+
+def gap_plan(params=None, optimize=None):
+    """The plan main() would write, returned instead: {'params', 'plan'
+    (gap-factory-locations.json content), 'issues', 'metrics'} for optional
+    SWEEP_PARAMS overrides and an optional --optimize budget. Writes nothing;
+    module constants are restored afterwards. Every input is re-read per
+    call, so a long-lived process sees edits made since import. Backs
+    server.py's /api/gap-plan."""
+    params = {k: sweep_value(k, v) for k, v in (params or {}).items()}
+    saved = {k: globals()[k] for k in params}
+    globals().update(params)
+    global RELEASED
+    RELEASED = load_released()     # the input files may have changed since
+    try:                           # import; a warm server worker re-reads
+        db = recipe_graph.load(DB_PATH)
+        UNIT_CACHE.bind(db)
+        pool = load_pool()
+        occ_stat = mark_occupied(pool)
+        extras, erosion_report = resolve_imports(db, load_current_production())
+        jobs = build_jobs(db, extras)
+        plan = optimize_plan(pool, jobs, optimize)[2] if optimize else None
+        order, placed, mining_towns = allocate(pool, jobs, plan)
+        out, unmatched = build_output(db, pool, order, occ_stat, placed,
+                                      erosion_report, mining_towns)
+        issues, _ = validate(out, pool, order, unmatched)
+        return {'params': {k: globals()[k] for k in SWEEP_PARAMS},
+                'plan': node_columns.encode(out), 'issues': issues,
+                'metrics': sweep_metrics(order, mining_towns)}
+    finally:
+        globals().update(saved)
+
+
+# ---------------------------------------------------------------- optimizer
+OPT_MAX_SKIP = 3                 # deepest runner-up primary center tried
+SHORTFALL_PENALTY = MAP_SPAN     # cost of 1/min unmet demand, in haul units:
+                                 # never trade real shortfall for a shorter map
+OPT_T0 = 0.02                    # annealing start temperature, x greedy cost
+_SEARCH_BASE = None              # (occupied pool, jobs, budget), set pre-fork
+
+
+def plan_cost(pool, order, towns):
+    """(validate issues, total shortfall/min, haul) — compared as a tuple."""
+    issues, _ = validate(None, pool, order, [])
+    shortfall = (sum(j.get('sig_shortfall', 0) for j in order)
+                 + sum(sum(j.get('trained_shortfall', {}).values())
+                       for j in order)
+                 + sum(t.get('shortfall_per_min', 0) for t in towns))
+    return (len(issues), round(shortfall, 1),
+            round(haul_distance(order, towns)))
+
+
+def _scalar(cost):
+    issues, shortfall, haul = cost
+    return (issues * 1000 + shortfall) * SHORTFALL_PENALTY + haul
+
+
+def _evaluate(pool, jobs, plan):
+    mark = pool.checkpoint()
+    try:
+        order, _, towns = allocate(pool, copy.deepcopy(jobs), plan)
+        return plan_cost(pool, order, towns)
+    finally:
+        pool.rollback(mark)
+
+
+def _neighbour(plan, movable, rng):
+    """Move one job elsewhere in the order, or change one job's center skip."""
+    order, skip = list(plan['order']), dict(plan['skip'])
+    if movable and rng.random() < 0.5:
+        fid = rng.choice(movable)
+        skip[fid] = rng.choice([k for k in range(OPT_MAX_SKIP + 1)
+                                if k != skip.get(fid, 0)])
+        if not skip[fid]:
+            del skip[fid]
+    else:
+        i, k = rng.sample(range(len(order)), 2)
+        order.insert(k, order.pop(i))
+    return {'order': order, 'skip': skip}
+
+
+def _anneal(seed):
+    """One simulated-annealing chain from the greedy plan until the budget
+    runs out -> (best cost, best plan, evaluations)."""
+    pool, jobs, budget = _SEARCH_BASE
+    rng = random.Random(seed)
+    movable = [j['id'] for j in jobs
+               if j['kind'] == 'new' and not j.get('anchor')]
+    cur = {'order': [j['id'] for j in
+                     sorted(jobs, key=lambda j: pressure_key(pool, j))],
+           'skip': {}}
+    cur_cost = _evaluate(pool, jobs, cur)
+    best, best_cost = cur, cur_cost
+    t0 = OPT_T0 * max(_scalar(cur_cost), 1.0)
+    start, evals = time.monotonic(), 1
+    while len(cur['order']) > 1:
+        frac = (time.monotonic() - start) / budget
+        if frac >= 1:
+            break
+        cand = _neighbour(cur, movable, rng)
+        cost = _evaluate(pool, jobs, cand)
+        evals += 1
+        delta = _scalar(cost) - _scalar(cur_cost)
+        if delta <= 0 or rng.random() < math.exp(-delta / (t0 * (1 - frac))):
+            cur, cur_cost = cand, cost
+            if cost < best_cost:
+                best, best_cost = cand, cost
+    return best_cost, best, evals
+
+
+def optimize_plan(pool, jobs, budget, workers=1):
+    """Search job orders and primary-center choices for `budget` seconds with
+    one annealing chain per worker (fork()ed; each rolls its own pool copy
+    back after every trial). Returns (greedy cost, best cost, plan or None,
+    evaluations); the plan is None unless it strictly beats greedy."""
+    global _SEARCH_BASE
+    _SEARCH_BASE = (pool, jobs, budget)
+    greedy = _evaluate(pool, jobs, None)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        chains = [_anneal(0)]
+    else:
+        with multiprocessing.get_context('fork').Pool(workers) as procs:
+            chains = procs.map(_anneal, range(workers))
+    cost, plan, _ = min(chains, key=lambda c: c[0])
+    evals = sum(c[2] for c in chains)
+    if cost < greedy:
+        return greedy, cost, plan, evals
+    return greedy, greedy, None, evals
+
+
+def main(optimize=None, workers=1):
+    db = recipe_graph.load(DB_PATH)
     # CHANGE 1 module-init guards: targets must be real .sft SET targets (no
     # input-only phantoms) and every flavor split must sum to its target.
     assert_no_phantom_targets(db)
@@ -1681,7 +2258,15 @@ def main():
         print(f"  {j['name']:22} sig={j['signature']:9} "
               f"pk={pk[0]:.3f} raw={ {k: round(v) for k, v in j['raw_demand'].items()} }")
 
-    order, placed, mining_towns = allocate(pool, jobs)
+    plan = None
+    if optimize:
+        greedy, best, plan, evals = optimize_plan(pool, jobs, optimize,
+                                                  workers)
+        print(f"\n=== optimizer ({optimize:g}s, {evals} plans tried) ===")
+        print("  cost = (validation issues, shortfall/min, haul)")
+        print(f"  greedy    {greedy}")
+        print(f"  optimized {best}" + ("" if plan else "  (greedy kept)"))
+    order, placed, mining_towns = allocate(pool, jobs, plan)
     # `order` includes the NE saturation factories (Change 2) added during
     # allocation; build output from it so they reach the JSON + map injection.
     out, unmatched = build_output(db, pool, order, occ_stat, placed,
@@ -1719,12 +2304,32 @@ def main():
     else:
         print("\nAll hard validation checks passed.")
 
-    json.dump(out, open(OUTPUT_PATH, 'w'), indent=2)
+    json.dump(node_columns.encode(out), open(OUTPUT_PATH, 'w'),
+              separators=(',', ':'))
     print(f"\nWritten {OUTPUT_PATH}")
-    n_f, n_t = inject_map(out)
-    print(f"Injected {n_f} gap factories + {n_t} mining towns into {MAP_HTML} "
-          f"(GAP_DATA block, parse-checked OK)")
+    n_f, n_t = write_map_data(out)
+    print(f"Wrote {n_f} gap factories + {n_t} mining towns for the map "
+          f"({MAP_DATA})")
+    print(f"Unit-vector cache: {UNIT_CACHE.hits} hits, "
+          f"{UNIT_CACHE.misses} misses "
+          f"({len(UNIT_CACHE)}/{UNIT_CACHE.maxsize} entries)")
 
 
 if __name__ == '__main__':
-    main()
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--sweep', action='append', metavar='PARAM=V1,V2,...',
+                    help='sweep mode: allocate every combination of these '
+                         f'values ({", ".join(SWEEP_PARAMS)}) and print a '
+                         'metrics table; no outputs are written')
+    ap.add_argument('--optimize', type=float, metavar='SECONDS',
+                    help='search job orders / primary centers for this long '
+                         'and keep the plan only if it beats greedy on '
+                         '(validation issues, shortfall, haul)')
+    ap.add_argument('--jobs', type=int, default=1,
+                    help='sweep combinations / annealing chains in N worker '
+                         'processes (0 = one per core)')
+    args = ap.parse_args()
+    if args.sweep:
+        sweep(args.sweep, args.jobs)
+    else:
+        main(args.optimize, args.jobs)
@@ -16,8 +16,9 @@ Steps:
 No external deps; stdlib only.
 """
 import json
-import math
-from collections import Counter, defaultdict
+from collections import Counter
+
+from clustering import single_linkage
 
 NODES_FILE = "/Users/deepak/AI/satisfy/resource_nodes.json"
 LINK_DIST = 47000.0  # single-linkage threshold (units)
@@ -33,34 +34,6 @@ def load_ne_pure():
     return ne
 
 
-def single_linkage(nodes, thresh):
-    """Union-find single-linkage: merge any two nodes within `thresh`."""
-    n = len(nodes)
-    parent = list(range(n))
-
-    def find(a):
-        while parent[a] != a:
-            parent[a] = parent[parent[a]]
-            a = parent[a]
-        return a
-
-    def union(a, b):
-        ra, rb = find(a), find(b)
-        if ra != rb:
-            parent[ra] = rb
-
-    for i in range(n):
-        xi, yi = nodes[i]["x"], nodes[i]["y"]
-        for j in range(i + 1, n):
-            if math.hypot(xi - nodes[j]["x"], yi - nodes[j]["y"]) <= thresh:
-                union(i, j)
-
-    clusters = defaultdict(list)
-    for i in range(n):
-        clusters[find(i)].append(nodes[i])
-    return list(clusters.values())
-
-
 def mix_string(cluster):
     c = Counter(n["type"] for n in cluster)
     order = ["iron", "copper", "limestone", "coal", "caterium",
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+node_columns.py — columnar encoding of resource-node lists in JSON outputs.
+
+The gap planner's outputs repeat a small dict per node —
+{'x', 'y', 't', 'p', 'k', 'oc', 'sh'} — in every site, outpost and mining
+town. encode() replaces each such `nodes` list with `node_ids` (integers)
+into ONE top-level `node_table` stored as columns:
+
+    {"encoding": "columnar-v1", "count": N, "scale": 100,
+     "x": <b64 Int32>, "y": <b64 Int32>,       # round(coord * scale)
+     "t": {"names": [...], "codes": <b64 Uint8>},  # likewise "p", "k"
+     "oc": <b64 Uint16>, "sh": <b64 Uint8>}
+
+Arrays are little-endian, base64'd; the browser maps them straight onto
+typed arrays (decodeNodeTable() in factory-map.html). Coordinates are
+quantized to 1/scale unit (0.01 cm). decode() restores the inline form.
+
+Shared by find_gap_factory_locations (gap-factory-locations.json and
+gap-map-data) and compute_factory_details (gap-factory-details.json).
+No external deps; stdlib only.
+"""
+import base64
+import sys
+from array import array
+
+ENCODING = 'columnar-v1'
+SCALE = 100
+_CATEGORICAL = ('t', 'p', 'k')
+_NUMERIC = (('oc', 'H'), ('sh', 'B'))
+
+
+def _pack(typecode, values):
+    a = array(typecode, values)
+    if sys.byteorder == 'big':
+        a.byteswap()
+    return base64.b64encode(a.tobytes()).decode('ascii')
+
+
+def _unpack(typecode, text):
+    a = array(typecode)
+    a.frombytes(base64.b64decode(text))
+    if sys.byteorder == 'big':
+        a.byteswap()
+    return a
+
+
+def _is_node_list(v):
+    return isinstance(v, list) and all(
+        isinstance(n, dict) and 'x' in n and 'y' in n for n in v)
+
+
+def encode(doc):
+    """Copy of `doc` with every inline node list swapped for `node_ids` and a
+    top-level `node_table`; `doc` itself is left untouched. Identical nodes
+    share one id."""
+    rows, ids = [], {}
+
+    def node_id(n):
+        key = tuple(n.get(c) for c in ('x', 'y') + _CATEGORICAL
+                    + tuple(c for c, _ in _NUMERIC))
+        if key not in ids:
+            ids[key] = len(rows)
+            rows.append(n)
+        return ids[key]
+
+    def walk(o):
+        if isinstance(o, dict):
+            out = {}
+            for k, v in o.items():
+                if k == 'nodes' and _is_node_list(v):
+                    out['node_ids'] = [node_id(n) for n in v]
+                else:
+                    out[k] = walk(v)
+            return out
+        if isinstance(o, list):
+            return [walk(v) for v in o]
+        return o
+
+    out = walk(doc)
+    table = {'encoding': ENCODING, 'count': len(rows), 'scale': SCALE,
+             'x': _pack('i', (round(n['x'] * SCALE) for n in rows)),
+             'y': _pack('i', (round(n['y'] * SCALE) for n in rows))}
+    for col in _CATEGORICAL:
+        names = sorted({n[col] for n in rows})
+        code = {name: i for i, name in enumerate(names)}
+        table[col] = {'names': names,
+                      'codes': _pack('B', (code[n[col]] for n in rows))}
+    for col, typecode in _NUMERIC:
+        table[col] = _pack(typecode, (n.get(col, 0) for n in rows))
+    out['node_table'] = table
+    return out
+
+
+def decode_table(table):
+    """node_table -> [node dict] in id order."""
+    if table.get('encoding') != ENCODING:
+        raise ValueError(f"unknown node_table encoding {table.get('encoding')!r}")
+    scale = table['scale']
+    cols = {'x': [v / scale for v in _unpack('i', table['x'])],
+            'y': [v / scale for v in _unpack('i', table['y'])]}
+    for col in _CATEGORICAL:
+        names = table[col]['names']
+        cols[col] = [names[c] for c in _unpack('B', table[col]['codes'])]
+    for col, typecode in _NUMERIC:
+        cols[col] = list(_unpack(typecode, table[col]))
+    return [dict(zip(cols, vals)) for vals in zip(*cols.values())]
+
+
+def decode(doc):
+    """Inverse of encode(): `node_ids` back to inline `nodes` dicts."""
+    if 'node_table' not in doc:
+        return doc
+    nodes = decode_table(doc['node_table'])
+
+    def walk(o):
+        if isinstance(o, dict):
+            return {('nodes' if k == 'node_ids' else k):
+                    ([dict(nodes[i]) for i in v] if k == 'node_ids' else walk(v))
+                    for k, v in o.items()}
+        if isinstance(o, list):
+            return [walk(v) for v in o]
+        return o
+
+    out = walk(doc)
+    del out['node_table']
+    return out
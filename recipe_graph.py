@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""Compiled recipe graph over satisfactory.db, shared by every pipeline script.
+
+The DB is read ONCE (five bulk SELECTs) into a compact, integer-indexed graph:
+items, buildings and recipes are numbered 0..N-1 and each recipe's inputs,
+outputs and buildings are CSR columns — `in_ptr[r]:in_ptr[r+1]` slices the flat
+`in_item` / `in_rate` arrays, likewise `out_*` and `bld_*`. Rates are
+per-building per-minute at 100% clock with fluids normalized from the DB's mL
+to m^3 (items in category liquid/gas, /1000), so callers never touch SQL or
+re-derive units; decomposition is dict/array lookups only.
+
+    g = recipe_graph.load()
+    out, inp = g.recipe_io('Alternate: Pure Aluminum Ingot')   # {name: per_min}
+    g.default_recipe('Aluminum Ingot')                         # -> recipe name
+    g.recipe_building('Aluminum Ingot')                        # (name, MW)
+
+Item / recipe rows keep the DB's rowid order, so "first match" semantics of the
+old per-script queries are preserved. Rows referencing items or buildings that
+are not in the items/buildings tables (build-gun / workshop entries) are
+dropped, exactly as the old JOINs dropped them.
+
+SNAPSHOT: db-scripts/build_db.py (or `python recipe_graph.py [db]`) also writes
+a versioned binary snapshot next to the DB (satisfactory.db ->
+satisfactory.graph): the same columns as flat little-endian arrays plus the
+string tables and producer index — no pickle. `load()` mmaps it and checks it
+against the DB's sha256, so a planner cold start is one file map instead of a
+SQL compile; a missing/stale/old-version snapshot falls back to SQL.
+
+Stdlib-only.
+"""
+import hashlib
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+from array import array
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       'satisfactory.db')
+FLUID_CATEGORIES = ('liquid', 'gas')     # DB stores these quantities in mL
+
+STR_COLUMNS = ('item_id', 'item_class', 'item_name', 'item_category',
+               'building_id', 'building_name',
+               'recipe_id', 'recipe_class', 'recipe_name')
+NUM_COLUMNS = {                          # name -> array typecode
+    'item_fluid': 'b', 'building_power': 'd', 'recipe_duration': 'd',
+    'in_ptr': 'i', 'in_item': 'i', 'in_rate': 'd',
+    'out_ptr': 'i', 'out_item': 'i', 'out_rate': 'd',
+    'out_primary': 'b',                  # 1 = max raw-qty product (primary)
+    'bld_ptr': 'i', 'bld_item': 'i',
+    'prod_ptr': 'i', 'prod_recipe': 'i',  # item -> producing recipes (CSR)
+}
+
+
+class RecipeGraph:
+    """Integer-indexed items/buildings/recipes. Build via `from_db` /
+    `from_snapshot` (or the process-wide `load`); the column attributes are
+    read-only by convention (snapshot columns are mmap-backed memoryviews)."""
+
+    def __init__(self, cols, source='db'):
+        for name in STR_COLUMNS + tuple(NUM_COLUMNS):
+            setattr(self, name, cols[name])
+        self.source = source
+        self._index()
+
+    def _index(self):
+        """Name / id lookups and the producer index (recipe order)."""
+        self.item_by_id = {iid: i for i, iid in enumerate(self.item_id)}
+        self.item_by_name = {}
+        for i, nm in enumerate(self.item_name):
+            self.item_by_name.setdefault(nm, i)
+        self.recipe_by_id = {rid: r for r, rid in enumerate(self.recipe_id)}
+        self.recipes_named = {}
+        for r, nm in enumerate(self.recipe_name):
+            self.recipes_named.setdefault(nm, []).append(r)
+        self.producers = [self.prod_recipe[self.prod_ptr[i]:self.prod_ptr[i + 1]].tolist()
+                          for i in range(len(self.item_id))]
+        self._io = {}
+        self._default = {}
+
+    # ------------------------------------------------------------ loading
+    @classmethod
+    def from_db(cls, path=DB_PATH):
+        con = sqlite3.connect(path)
+        try:
+            items = con.execute('SELECT id, class_name, name, category '
+                                'FROM items ORDER BY rowid').fetchall()
+            buildings = con.execute('SELECT id, name, power_used '
+                                    'FROM buildings ORDER BY rowid').fetchall()
+            item_idx = {r[0]: i for i, r in enumerate(items)}
+            bld_idx = {r[0]: i for i, r in enumerate(buildings)}
+            rows = con.execute('SELECT id, class_name, name, duration '
+                               'FROM recipes ORDER BY rowid').fetchall()
+            ing, prod, blds = {}, {}, {}
+            for rid, iid, q in con.execute(
+                    'SELECT recipe_id, item_id, quantity '
+                    'FROM recipe_ingredients ORDER BY recipe_id, item_class'):
+                if iid in item_idx:
+                    ing.setdefault(rid, []).append((item_idx[iid], q))
+            for rid, iid, q in con.execute(
+                    'SELECT recipe_id, item_id, quantity '
+                    'FROM recipe_products ORDER BY recipe_id, item_class'):
+                if iid in item_idx:
+                    prod.setdefault(rid, []).append((item_idx[iid], q))
+            for rid, bid in con.execute(
+                    'SELECT recipe_id, building_id '
+                    'FROM recipe_buildings ORDER BY rowid'):
+                if bid in bld_idx:
+                    blds.setdefault(rid, []).append(bld_idx[bid])
+        finally:
+            con.close()
+        recipes = [(rid, cn, name, dur, ing.get(rid, []), prod.get(rid, []),
+                    blds.get(rid, []))
+                   for rid, cn, name, dur in rows if dur]
+        return cls(_compile(items, buildings, recipes))
+
+    @classmethod
+    def from_snapshot(cls, snap_path, db_path=None):
+        """Map a snapshot written by `write_snapshot`. Numeric columns stay
+        zero-copy views of the mapping; string tables are decoded once. When
+        `db_path` is given the snapshot must match that DB's content hash.
+        Raises SnapshotError on a bad magic/version/hash."""
+        with open(snap_path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # on error the mapping is left to the GC: live column views pin it
+        try:
+            magic, version, digest, ncol = _HEADER.unpack_from(mm, 0)
+            if magic != SNAPSHOT_MAGIC:
+                raise SnapshotError(f"{snap_path}: not a recipe-graph snapshot")
+            if version != SNAPSHOT_VERSION:
+                raise SnapshotError(f"{snap_path}: version {version}, "
+                                    f"expected {SNAPSHOT_VERSION}")
+            if db_path is not None and digest != db_digest(db_path):
+                raise SnapshotError(f"{snap_path}: stale for {db_path} "
+                                    "(content hash mismatch)")
+            view = memoryview(mm)
+            cols = {}
+            for k in range(ncol):
+                name, code, off, n = _ENTRY.unpack_from(
+                    mm, _HEADER.size + k * _ENTRY.size)
+                name, code = name.rstrip(b'\0').decode(), code.rstrip(b'\0').decode()
+                if code == 's':                   # int32 offsets + utf-8 blob
+                    offs = view[off:off + 4 * (n + 1)].cast('i')
+                    blob = bytes(view[off + 4 * (n + 1):off + 4 * (n + 1) + offs[n]])
+                    cols[name] = [blob[offs[j]:offs[j + 1]].decode()
+                                  for j in range(n)]
+                else:
+                    size = array(code).itemsize
+                    cols[name] = view[off:off + size * n].cast(code)
+        except (struct.error, TypeError, ValueError, IndexError) as e:
+            raise SnapshotError(f"{snap_path}: corrupt snapshot ({e})")
+        g = cls(cols, source='snapshot')
+        g._mm = mm                                # keep the mapping alive
+        return g
+
+    # ------------------------------------------------------------ per-recipe
+    def inputs(self, r):
+        """[(item_idx, per_min)] consumed by recipe index `r`."""
+        lo, hi = self.in_ptr[r], self.in_ptr[r + 1]
+        return list(zip(self.in_item[lo:hi], self.in_rate[lo:hi]))
+
+    def outputs(self, r):
+        """[(item_idx, per_min)] produced by recipe index `r`."""
+        lo, hi = self.out_ptr[r], self.out_ptr[r + 1]
+        return list(zip(self.out_item[lo:hi], self.out_rate[lo:hi]))
+
+    def buildings(self, r):
+        """[building_idx] recipe `r` can be crafted in (DB order)."""
+        return list(self.bld_item[self.bld_ptr[r]:self.bld_ptr[r + 1]])
+
+    def recipe_index(self, name, item=None, building=None):
+        """Recipe index by display name. Names are not unique in the DB; the
+        first row wins unless `item` (a product name) and optionally `building`
+        disambiguate. Raises ValueError for an unknown name."""
+        rs = self.recipes_named.get(name)
+        if not rs:
+            raise ValueError(f"recipe not found: {name!r}")
+        if len(rs) > 1 and item is not None:
+            for r in rs:
+                prods = {self.item_name[i] for i, _ in self.outputs(r)}
+                blds = {self.building_name[b] for b in self.buildings(r)}
+                if item in prods and (not building or building in blds):
+                    return r
+        return rs[0]
+
+    # ------------------------------------------------------------ by name
+    def recipe_io(self, recipe_name):
+        """({item: per_min out}, {item: per_min in}) for a recipe name."""
+        io = self._io.get(recipe_name)
+        if io is None:
+            r = self.recipe_index(recipe_name)
+            io = self._io[recipe_name] = (
+                {self.item_name[i]: q for i, q in self.outputs(r)},
+                {self.item_name[i]: q for i, q in self.inputs(r)})
+        return io
+
+    def recipe_building(self, recipe_name):
+        """(building name, base power MW) of the first building any recipe of
+        that name is crafted in; (None, 0) when it has none."""
+        for r in self.recipes_named.get(recipe_name, ()):
+            for b in self.buildings(r):
+                return self.building_name[b], self.building_power[b]
+        return None, 0
+
+    def default_recipe(self, item):
+        """Standard recipe for `item`: building-crafted (no Converter/Packager),
+        non-alternate first, then the recipe named like the item, then one
+        where `item` is the primary (max-quantity) product, then by name."""
+        if item in self._default:
+            return self._default[item]
+        i = self.item_by_name.get(item)
+        best = None
+        for r in (self.producers[i] if i is not None else ()):
+            if not any('converter' not in self.building_name[b].lower()
+                       and 'packager' not in self.building_name[b].lower()
+                       for b in self.buildings(r)):
+                continue
+            nm = self.recipe_name[r]
+            primary = any(self.out_item[k] == i and self.out_primary[k]
+                          for k in range(self.out_ptr[r], self.out_ptr[r + 1]))
+            key = (nm.lower().startswith('alternate:'), nm != item,
+                   not primary, nm)
+            if best is None or key < best:
+                best = key
+        if best is None:
+            raise ValueError(f"no producing recipe for {item!r}")
+        self._default[item] = best[3]
+        return best[3]
+
+    # ------------------------------------------------------------ items
+    def is_fluid(self, item_name):
+        i = self.item_by_name.get(item_name)
+        return i is not None and bool(self.item_fluid[i])
+
+    def class_suffix_names(self):
+        """{trailing Desc_*_C of class_name: item name} (.sft item keys)."""
+        return {cn.rsplit('.', 1)[-1]: nm
+                for cn, nm in zip(self.item_class, self.item_name)}
+
+
+def _compile(items, buildings, recipes):
+    """Rows from the DB -> column dict (see STR_COLUMNS / NUM_COLUMNS).
+    items: [(id, class_name, name, category)]; buildings: [(id, name,
+    power_used)]; recipes: [(id, class_name, name, duration,
+    [(item_idx, qty)], [(item_idx, qty)], [building_idx])]."""
+    c = {'item_id': [r[0] for r in items],
+         'item_class': [r[1] or '' for r in items],
+         'item_name': [r[2] for r in items],
+         'item_category': [r[3] or '' for r in items],
+         'building_id': [r[0] for r in buildings],
+         'building_name': [r[1] for r in buildings],
+         'recipe_id': [], 'recipe_class': [], 'recipe_name': []}
+    for name in NUM_COLUMNS:
+        c[name] = array(NUM_COLUMNS[name])
+    c['item_fluid'].extend(cat in FLUID_CATEGORIES for cat in c['item_category'])
+    c['building_power'].extend(float(r[2] or 0) for r in buildings)
+    for ptr in ('in_ptr', 'out_ptr', 'bld_ptr'):
+        c[ptr].append(0)
+
+    def per_min(item, qty, duration):
+        if c['item_fluid'][item]:
+            qty = qty / 1000.0
+        return qty / duration * 60
+
+    producers = [[] for _ in items]
+    for rid, cn, name, dur, ing, prod, blds in recipes:
+        r = len(c['recipe_id'])
+        c['recipe_id'].append(rid)
+        c['recipe_class'].append(cn or '')
+        c['recipe_name'].append(name)
+        c['recipe_duration'].append(dur)
+        for it, q in ing:
+            c['in_item'].append(it)
+            c['in_rate'].append(per_min(it, q, dur))
+        c['in_ptr'].append(len(c['in_item']))
+        maxq = max((q for _, q in prod), default=None)
+        for it, q in prod:
+            c['out_item'].append(it)
+            c['out_rate'].append(per_min(it, q, dur))
+            c['out_primary'].append(q == maxq)
+            producers[it].append(r)
+        c['out_ptr'].append(len(c['out_item']))
+        c['bld_item'].extend(blds)
+        c['bld_ptr'].append(len(c['bld_item']))
+    c['prod_ptr'].append(0)
+    for rs in producers:
+        c['prod_recipe'].extend(rs)
+        c['prod_ptr'].append(len(c['prod_recipe']))
+    return c
+
+
+# ---------------------------------------------------------------- snapshot
+# Layout (little-endian): header, column directory, then each column 8-byte
+# aligned. Numeric columns are raw array bytes; string columns are int32
+# offsets (n+1) followed by the utf-8 blob. Bump SNAPSHOT_VERSION whenever the
+# column set or the compile rules (ordering, fluid normalization) change.
+SNAPSHOT_MAGIC = b'SFGRAPH\0'
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct('<8sI32sI')       # magic, version, db sha256, ncols
+_ENTRY = struct.Struct('<16s4sQQ')        # name, typecode, offset, count
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def snapshot_path(db_path):
+    """satisfactory.db -> satisfactory.graph (same directory)."""
+    return os.path.splitext(db_path)[0] + '.graph'
+
+
+def db_digest(db_path):
+    """sha256 of the DB file's bytes — the snapshot's validity key."""
+    h = hashlib.sha256()
+    with open(db_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.digest()
+
+
+def write_snapshot(db_path=DB_PATH, snap_path=None):
+    """Compile `db_path` and write its snapshot (atomically). Returns the
+    snapshot path."""
+    snap_path = snap_path or snapshot_path(db_path)
+    g = RecipeGraph.from_db(db_path)
+    blobs = []
+    for name in STR_COLUMNS:
+        enc = [v.encode() for v in getattr(g, name)]
+        offs = array('i', [0])
+        for e in enc:
+            offs.append(offs[-1] + len(e))
+        blobs.append((name, 's', len(enc), _le(offs) + b''.join(enc)))
+    for name, code in NUM_COLUMNS.items():
+        col = getattr(g, name)
+        blobs.append((name, code, len(col), _le(col)))
+    pos = _align(_HEADER.size + _ENTRY.size * len(blobs))
+    directory, body = [], bytearray()
+    for name, code, n, data in blobs:
+        directory.append(_ENTRY.pack(name.encode(), code.encode(), pos + len(body), n))
+        body += data + b'\0' * (_align(len(data)) - len(data))
+    head = (_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, db_digest(db_path),
+                         len(blobs)) + b''.join(directory))
+    tmp = snap_path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(head + b'\0' * (pos - len(head)))
+        f.write(body)
+    os.replace(tmp, snap_path)
+    return snap_path
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def _le(col):
+    """Array bytes in little-endian order (the snapshot's byte order)."""
+    if sys.byteorder != 'little':
+        col = array(col.typecode, col)
+        col.byteswap()
+    return col.tobytes()
+
+
+_LOADED = {}                     # abspath -> (input stamps, RecipeGraph)
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def load(path=DB_PATH):
+    """Process-wide graph for `path`: the DB's snapshot when present and
+    matching the DB's content hash, else compiled from SQL. Reloaded when
+    the DB or its snapshot changes on disk, so long-lived processes (the
+    server's API workers) never plan against a stale graph."""
+    key = os.path.abspath(path)
+    snap = snapshot_path(key)
+    stamp = (_stamp(key), _stamp(snap))
+    hit = _LOADED.get(key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    g = None
+    if stamp[1] is not None:
+        try:
+            g = RecipeGraph.from_snapshot(snap, key)
+        except SnapshotError as e:
+            print(f"recipe_graph: {e}; compiling from SQL", file=sys.stderr)
+    if g is None:
+        g = RecipeGraph.from_db(key)
+    _LOADED[key] = (stamp, g)
+    return g
+
+
+if __name__ == '__main__':
+    print(f"wrote {write_snapshot(*sys.argv[1:2])}")
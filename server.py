@@ -1,20 +1,641 @@
 #!/usr/bin/env python3
-"""Lightweight HTTP server for the Satisfactory Factory Planner app."""
+"""Lightweight HTTP server for the Satisfactory Factory Planner app.
 
+Threaded (one slow client no longer blocks the rest) and cache-aware:
+  * files are held in memory, keyed by (mtime, size), and reloaded when the
+    pipeline rewrites them;
+  * text assets (HTML/JSON/JS/CSS) get a gzip variant — and brotli when the
+    optional `brotli` package is installed — built once per load;
+  * every representation has a strong ETag, so If-None-Match revalidation
+    answers 304 with no body;
+  * single byte ranges (Range / If-Range) are served for uncompressed
+    files, e.g. satisfactory-map.jpg;
+  * Cache-Control: images may be cached for a day, the regenerated HTML and
+    JSON are revalidated on every use;
+  * the map tile pyramid (build_tiles.py) is routed at /tiles/tiles.json and
+    /tiles/<version>/<z>/<x>/<y>.jpg; tiles and content-hashed data files
+    (gap-map-data.<hash>.json) are cached as immutable.
+
+API: POST /api/gap-plan runs find_gap_factory_locations.gap_plan() in a
+worker-process pool, e.g.
+    curl -d '{"params": {"SEARCH_RADIUS": 60000}, "optimize": 10}' \
+         localhost:8080/api/gap-plan
+Results are cached (LRU, keyed by parameters + input-file stamps) and served
+with the same gzip / ETag / 304 handling as files.
+
+Run: python server.py            (threaded)
+     python server.py --async    (asyncio streams: keep-alive + pipelining;
+                                  or set SERVER_MODE=async)
+
+Stdlib only (brotli is used if present, never required).
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import email.message
+import email.utils
+import gzip
+import hashlib
+import json
+import mimetypes
+import multiprocessing
 import os
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import posixpath
+import re
+import sys
+import threading
+import time
+import traceback
+import urllib.parse
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 PORT = int(os.environ.get("PORT", 8080))
+CACHE_MAX_FILE = 32 << 20        # larger files are streamed, not cached
+COMPRESS_MIN = 1024              # smaller bodies are not worth compressing
+COMPRESSIBLE = ("text/", "application/json", "application/javascript",
+                "image/svg+xml")
+CACHE_CONTROL = {"image/": "public, max-age=86400"}
+DEFAULT_CACHE_CONTROL = "no-cache"   # always revalidate (cheap: ETag -> 304)
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class CachedFile:
+    """One body (a file, or an API result) plus its precomputed encodings and
+    ETags. `stamp` is (mtime_ns, size) for files, the cache key for results."""
+
+    def __init__(self, body, stamp, ctype, mtime=None):
+        self.stamp, self.ctype = stamp, ctype
+        self.mtime = email.utils.formatdate(mtime, usegmt=True)
+        tag = hashlib.sha1(body).hexdigest()[:20]
+        # encoding -> (body, strong ETag); identity is always present
+        self.variants = {"identity": (body, f'"{tag}"')}
+        if ctype.startswith(COMPRESSIBLE) and len(body) >= COMPRESS_MIN:
+            gz = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gz) < len(body):
+                self.variants["gzip"] = (gz, f'"{tag}-gz"')
+            if brotli is not None:
+                br = brotli.compress(body)
+                if len(br) < len(body):
+                    self.variants["br"] = (br, f'"{tag}-br"')
+
+    def choose(self, accept_encoding):
+        """Best variant the client accepts: brotli, then gzip, then identity."""
+        accepted = {e.split(";")[0].strip().lower()
+                    for e in (accept_encoding or "").split(",")}
+        for enc in ("br", "gzip"):
+            if enc in self.variants and enc in accepted:
+                return enc
+        return "identity"
+
+    @classmethod
+    def load(cls, path, stamp, ctype):
+        with open(path, "rb") as f:
+            return cls(f.read(), stamp, ctype, stamp[0] / 1e9)
+
+
+class FileCache:
+    """Path -> CachedFile, reloaded whenever the file's mtime or size moves."""
+
+    def __init__(self):
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, ctype):
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._files.get(path)
+        if entry is None or entry.stamp != stamp:
+            entry = CachedFile.load(path, stamp, ctype)
+            with self._lock:
+                self._files[path] = entry
+        return entry
+
+
+CACHE = FileCache()
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def _parse_range(header, size):
+    """(start, end) for a single 'bytes=' range, or None if unsatisfiable.
+    Multi-range or malformed headers fall back to the whole body."""
+    m = _RANGE.match(header.strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        return (0, size)
+    if not m.group(1):                             # suffix: last N bytes
+        n = int(m.group(2))
+        return (max(size - n, 0), size) if n else None
+    start = int(m.group(1))
+    end = int(m.group(2)) + 1 if m.group(2) else size
+    if m.group(2) and end <= start:
+        return (0, size)                           # invalid: ignore it
+    if start >= size:
+        return None
+    return (start, min(end, size))
+
+
+def file_response(entry, headers, cache_control=None):
+    """(status, [(header, value)], body view) answering a GET for the cached
+    `entry` given the request `headers` (any mapping with .get). Shared by
+    the threaded and the asyncio servers. `cache_control` overrides the
+    per-type CACHE_CONTROL policy."""
+    enc = entry.choose(headers.get("Accept-Encoding"))
+    body, etag = entry.variants[enc]
+    if cache_control is None:
+        cache_control = next((cc for prefix, cc in CACHE_CONTROL.items()
+                              if entry.ctype.startswith(prefix)),
+                             DEFAULT_CACHE_CONTROL)
+    out = [("ETag", etag), ("Last-Modified", entry.mtime),
+           ("Cache-Control", cache_control)]
+    if len(entry.variants) > 1:
+        out.append(("Vary", "Accept-Encoding"))
+    if "gzip" not in entry.variants:
+        out.append(("Accept-Ranges", "bytes"))
+
+    if _etag_matches(headers.get("If-None-Match"), etag):
+        return HTTPStatus.NOT_MODIFIED, out, memoryview(b"")
+
+    status, start, end = HTTPStatus.OK, 0, len(body)
+    rng = headers.get("Range")
+    if rng and enc == "identity" and headers.get("If-Range", etag) == etag:
+        span = _parse_range(rng, len(body))
+        if span is None:
+            out += [("Content-Range", f"bytes */{len(body)}"),
+                    ("Content-Length", "0")]
+            return HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, out, memoryview(b"")
+        if span != (0, len(body)):
+            status, (start, end) = HTTPStatus.PARTIAL_CONTENT, span
+
+    out.append(("Content-Type", entry.ctype))
+    if enc != "identity":
+        out.append(("Content-Encoding", enc))
+    if status == HTTPStatus.PARTIAL_CONTENT:
+        out.append(("Content-Range", f"bytes {start}-{end - 1}/{len(body)}"))
+    out.append(("Content-Length", str(end - start)))
+    return status, out, memoryview(body)[start:end]
+
+
+# ---------------------------------------------------------------- routing
+def translate_path(url):
+    """URL path -> file under the current directory (as SimpleHTTPRequest-
+    Handler.translate_path: '..' and drive/dir components are dropped)."""
+    path = posixpath.normpath(urllib.parse.unquote(url))
+    full = os.getcwd()
+    for word in filter(None, path.split("/")):
+        if os.path.dirname(word) or word in (os.curdir, os.pardir):
+            continue
+        full = os.path.join(full, word)
+    return full
+
+
+# Content-addressed URLs can be cached forever: a new version is a new URL.
+# That covers the map tile pyramid (build_tiles.py), addressed by the
+# pyramid's version — the source image's hash; a stale version is a 404 —
+# and the planner's hashed data files (gap-map-data.<hash>.json).
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+TILE_DIR = "map-tiles"
+TILE_MANIFEST = TILE_DIR + "/tiles.json"
+_TILE = re.compile(r"/tiles/([0-9a-f]+)/(\d+)/(\d+)/(\d+)\.jpg$")
+_HASHED = re.compile(r"/[\w-]+\.[0-9a-f]{12}\.json$")
+_tile_manifest = (None, None)    # (manifest CachedFile, its version)
+
+
+def tile_version():
+    """Version of the built tile pyramid, or None if there is none."""
+    global _tile_manifest
+    try:
+        entry = CACHE.get(translate_path("/" + TILE_MANIFEST), "application/json")
+    except OSError:
+        return None
+    if _tile_manifest[0] is not entry:
+        try:
+            version = json.loads(entry.variants["identity"][0]).get("version")
+        except ValueError:
+            version = None
+        _tile_manifest = (entry, version)
+    return _tile_manifest[1]
+
+
+def route(url):
+    """(file path or None, Cache-Control override or None) for a GET of the
+    URL path `url`: '/' is the map page, /tiles/tiles.json the pyramid
+    manifest, /tiles/<version>/<z>/<x>/<y>.jpg one tile; anything else maps
+    straight onto the current directory (content-hashed *.json immutable)."""
+    if url in ("", "/"):
+        url = "/factory-map.html"
+    if url == "/tiles/tiles.json":
+        return translate_path("/" + TILE_MANIFEST), None
+    m = _TILE.match(url)
+    if m:
+        if m.group(1) != tile_version():
+            return None, None
+        z, x, y = m.group(2, 3, 4)
+        return (translate_path(f"/{TILE_DIR}/{z}/{x}/{y}.jpg"),
+                IMMUTABLE_CACHE_CONTROL)
+    if _HASHED.match(url):
+        return translate_path(url), IMMUTABLE_CACHE_CONTROL
+    return translate_path(url), None
+
+
+# ---------------------------------------------------------------- api
+# POST /api/<name> with a JSON body runs a planner in a process pool (each
+# worker keeps its own recipe graph / unit-vector cache warm between calls).
+# Results are cached in an LRU keyed by a hash of the route, the request's
+# parameters and the (mtime, size) of every input file, so a repeated request
+# is answered from memory and a new parameter set computes once — concurrent
+# identical requests share the one in-flight computation.
+API_WORKERS = int(os.environ.get("API_WORKERS", 0)) or os.cpu_count() or 1
+API_CACHE_SIZE = 64              # results kept (LRU)
+API_MAX_BODY = 64 << 10
+API_MAX_OPTIMIZE = 60            # seconds an /api/gap-plan optimize may take
+GAP_INPUTS = ("satisfactory.db", "resource_nodes.json",
+              "planner-export/occupied-nodes.json", "reuse-nodes.json",
+              "selected-factory-locations.json", "factory-subunits.json",
+              "planner-export/current-production.txt",
+              "planner-export/sftools-export-2026-04-01-20-02-03.sft")
+
+
+class ApiError(Exception):
+    """A request the API refuses; carries the HTTP status to answer with.
+    (Both args go to Exception so it pickles back from a pool worker.)"""
+
+    def __init__(self, status, message):
+        super().__init__(status, message)
+        self.status, self.message = status, message
+
+    def __str__(self):
+        return self.message
+
+
+def _gap_plan(params, optimize):
+    import find_gap_factory_locations as gap
+    try:
+        result = gap.gap_plan(params, optimize)
+    except (ValueError, TypeError) as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, str(e)) from None
+    return json.dumps(result, indent=1).encode()
+
+
+def _gap_plan_args(payload):
+    """Validated (params, optimize) from a /api/gap-plan request body:
+    {"params": {"SEARCH_RADIUS": 60000, ...}, "optimize": seconds}. Each
+    parameter is range-checked against the planner's SWEEP_BOUNDS here, so a
+    bad value is a 400 before it reaches a pool worker."""
+    params = payload.get("params") or {}
+    if not isinstance(params, dict) or not all(
+            isinstance(v, (int, float)) and not isinstance(v, bool)
+            for v in params.values()):
+        raise ApiError(HTTPStatus.BAD_REQUEST,
+                       '"params" must map parameter names to numbers')
+    try:
+        optimize = float(payload.get("optimize") or 0)
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST,
+                       '"optimize" must be a number of seconds') from None
+    if not 0 <= optimize <= API_MAX_OPTIMIZE:
+        raise ApiError(HTTPStatus.BAD_REQUEST,
+                       f'"optimize" must be 0..{API_MAX_OPTIMIZE} seconds')
+    import find_gap_factory_locations as gap
+    try:
+        params = {k.upper(): gap.sweep_value(k.upper(), v)
+                  for k, v in params.items()}
+    except ValueError as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, str(e)) from None
+    return params, optimize or None
+
+
+API_ROUTES = {"/api/gap-plan": (_gap_plan_args, _gap_plan, GAP_INPUTS)}
+
+
+class ResultCache:
+    """LRU of cache key -> Future[CachedFile]; failed computations are
+    dropped so they can be retried."""
+
+    def __init__(self, maxsize=API_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._results = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def submit(self, key, fn, *args):
+        with self._lock:
+            fut = self._results.get(key)
+            if fut is not None:
+                self._results.move_to_end(key)
+                return fut
+            if self._pool is None:
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    API_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            fut = concurrent.futures.Future()
+            self._results[key] = fut
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        work = self._pool.submit(fn, *args)
+
+        def done(w):
+            try:
+                fut.set_result(CachedFile(w.result(), key, "application/json",
+                                          time.time()))
+            except BaseException as e:
+                with self._lock:
+                    if self._results.get(key) is fut:
+                        del self._results[key]
+                fut.set_exception(e)
+        work.add_done_callback(done)
+        return fut
+
+
+RESULTS = ResultCache()
+
+
+def api_submit(route, body):
+    """Future[CachedFile] answering POST `route` with JSON `body` (bytes).
+    Raises ApiError for unknown routes and malformed requests."""
+    if route not in API_ROUTES:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"no API route {route}")
+    parse, fn, inputs = API_ROUTES[route]
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "body is not JSON") from None
+    if not isinstance(payload, dict):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+    args = parse(payload)
+    stamps = []
+    for name in inputs:
+        try:
+            st = os.stat(name)
+            stamps.append((name, st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamps.append((name, None, None))
+    key = hashlib.sha256(json.dumps([route, args, stamps], sort_keys=True)
+                         .encode()).hexdigest()
+    return RESULTS.submit(key, fn, *args)
+
+
+def api_error_body(status, message):
+    return json.dumps({"error": message, "status": int(status)}).encode()
+
+
+def api_failure(url, exc):
+    """Log an unexpected API failure in full; the client only gets a generic
+    message (the traceback names files and planner internals)."""
+    print(f"API {url} failed:", file=sys.stderr)
+    traceback.print_exception(exc)
+    return "internal error while computing the result"
+
+
+def request_length(headers):
+    """The request's Content-Length (0 if absent); ApiError 400 if it is not
+    a non-negative integer, 413 if it exceeds API_MAX_BODY."""
+    value = (headers.get("Content-Length") or "").strip()
+    if not value:
+        return 0
+    if not value.isdigit():
+        raise ApiError(HTTPStatus.BAD_REQUEST, "invalid Content-Length")
+    length = int(value)
+    if length > API_MAX_BODY:
+        raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                       "request body too large")
+    return length
 
 
 class Handler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
     def do_GET(self):
-        if self.path == "/" or self.path == "":
+        self._serve(head=False)
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def do_POST(self):
+        try:
+            length = request_length(self.headers)
+        except ApiError as e:
+            # the body is left unread: don't parse it as the next request
+            self.close_connection = True
+            self._send_json_error(e.status, str(e))
+            return
+        body = self.rfile.read(length)
+        if len(body) < length:           # client hung up mid-body
+            self.close_connection = True
+            return
+        url = self.path.split("?", 1)[0]
+        try:
+            entry = api_submit(url, body).result()
+        except ApiError as e:
+            self._send_json_error(e.status, str(e))
+            return
+        except Exception as e:
+            self._send_json_error(HTTPStatus.INTERNAL_SERVER_ERROR,
+                                  api_failure(url, e))
+            return
+        status, headers, body = file_response(entry, self.headers)
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json_error(self, status, message):
+        body = api_error_body(status, message)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve(self, head):
+        path, cache_control = route(self.path.split("?", 1)[0].split("#", 1)[0])
+        if path is None:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return
+        if self.path in ("", "/"):
             self.path = "/factory-map.html"
-        return super().do_GET()
+        if not os.path.isfile(path) or os.path.getsize(path) > CACHE_MAX_FILE:
+            # directories, 404s and huge files: stock handler
+            f = self.send_head()
+            if f:
+                try:
+                    if not head:
+                        self.copyfile(f, self.wfile)
+                finally:
+                    f.close()
+            return
+        try:
+            entry = CACHE.get(path, self.guess_type(path))
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return
+        status, headers, body = file_response(entry, self.headers,
+                                              cache_control)
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+
+# ---------------------------------------------------------------- asyncio
+# --async: one event loop, asyncio streams. Each connection is kept alive;
+# requests are parsed as they arrive and answered concurrently (file loads go
+# through the default thread executor), but written back strictly in request
+# order, so pipelined clients get their responses without waiting for a
+# reply per request. Only cached files are served (no directory listings).
+MAX_HEADER_BYTES = 64 << 10
+KEEPALIVE_TIMEOUT = 15           # seconds an idle connection is held open
+
+
+async def _read_request(reader):
+    """(method, target, version, headers, body) or None at EOF / idle
+    timeout / malformed request line. ApiError for a bad Content-Length:
+    the body is not read, so the connection must close after answering."""
+    try:
+        raw = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"),
+                                     KEEPALIVE_TIMEOUT)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError,
+            asyncio.LimitOverrunError, ConnectionError):
+        return None
+    lines = raw.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split()
+    except ValueError:
+        return None
+    headers = email.message.Message()
+    for line in lines[1:]:
+        if ":" in line:
+            name, _, value = line.partition(":")
+            headers[name.strip()] = value.strip()
+    length = request_length(headers)
+    try:
+        body = await reader.readexactly(length) if length else b""
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    return method, target, version, headers, body
+
+
+async def _respond(method, target, headers, body):
+    """(status, headers, body) for one request."""
+    url = target.split("?", 1)[0].split("#", 1)[0]
+    if method == "POST":
+        try:
+            entry = await asyncio.wrap_future(api_submit(url, body))
+        except ApiError as e:
+            status, message = e.status, str(e)
+        except Exception as e:
+            status = HTTPStatus.INTERNAL_SERVER_ERROR
+            message = api_failure(url, e)
+        else:
+            return file_response(entry, headers)
+        return _error_response(status, message)
+    if method not in ("GET", "HEAD"):
+        return HTTPStatus.NOT_IMPLEMENTED, [("Content-Length", "0")], b""
+    loop = asyncio.get_running_loop()
+    try:
+        path, cache_control = await loop.run_in_executor(None, route, url)
+        entry = path and await loop.run_in_executor(
+            None, _load_static, path, mimetypes.guess_type(path)[0])
+    except OSError:
+        entry = None
+    if entry is None:
+        return HTTPStatus.NOT_FOUND, [("Content-Length", "0")], b""
+    status, out, body = file_response(entry, headers, cache_control)
+    return status, out, (b"" if method == "HEAD" else body)
+
+
+def _error_response(status, message):
+    err = api_error_body(status, message)
+    return status, [("Content-Type", "application/json"),
+                    ("Content-Length", str(len(err)))], err
+
+
+async def _reject(e):
+    """Response for a request refused before dispatch (ApiError `e`)."""
+    return _error_response(e.status, str(e))
+
+
+def _load_static(path, ctype):
+    if not os.path.isfile(path) or os.path.getsize(path) > CACHE_MAX_FILE:
+        return None
+    return CACHE.get(path, ctype or "application/octet-stream")
+
+
+async def _connection(reader, writer):
+    queue = asyncio.Queue()
+
+    async def send_in_order():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            task, close = item
+            status, out, body = await task
+            head = [f"HTTP/1.1 {status.value} {status.phrase}",
+                    f"Date: {email.utils.formatdate(usegmt=True)}"]
+            head += [f"{name}: {value}" for name, value in out]
+            if close:
+                head.append("Connection: close")
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+            writer.write(body)
+            await writer.drain()
+            if close:
+                return
+
+    sender = asyncio.create_task(send_in_order())
+    try:
+        while not sender.done():
+            try:
+                req = await _read_request(reader)
+            except ApiError as e:
+                queue.put_nowait((asyncio.create_task(_reject(e)), True))
+                break
+            if req is None:
+                break
+            method, target, version, headers, body = req
+            conn = (headers.get("Connection") or "").lower()
+            close = conn == "close" or (version == "HTTP/1.0"
+                                        and conn != "keep-alive")
+            queue.put_nowait((asyncio.create_task(
+                _respond(method, target, headers, body)), close))
+            if close:
+                break
+        queue.put_nowait(None)
+        await sender
+    except ConnectionError:
+        pass
+    finally:
+        sender.cancel()
+        writer.close()
+
+
+async def serve_async(port):
+    server = await asyncio.start_server(_connection, "0.0.0.0", port,
+                                        limit=MAX_HEADER_BYTES)
+    print(f"Serving on port {port} (asyncio)")
+    async with server:
+        await server.serve_forever()
 
 
 if __name__ == "__main__":
-    server = HTTPServer(("0.0.0.0", PORT), Handler)
-    print(f"Serving on port {PORT}")
-    server.serve_forever()
+    if "--async" in sys.argv[1:] or os.environ.get("SERVER_MODE") == "async":
+        asyncio.run(serve_async(PORT))
+    else:
+        server = ThreadingHTTPServer(("0.0.0.0", PORT), Handler)
+        server.daemon_threads = True
+        print(f"Serving on port {PORT}")
+        server.serve_forever()
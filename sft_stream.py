@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+sft_stream.py — incremental decoder for Satisfactory Tools .sft exports.
+
+Format: '#' comment header, then ONE payload line = version char +
+base64(zlib(json)), where the json is {"type": ..., "tabs": [tab, ...]}.
+
+iter_tabs() never materialises the payload, the inflated text or the parsed
+document: the base64 line is read CHUNK characters at a time, fed through
+zlib.decompressobj, and the JSON is parsed with JSONDecoder.raw_decode one tab
+at a time. Peak memory is about one tab plus a chunk, however many saves the
+export bundles. Shared by find_gap_factory_locations and both demand
+derivations.
+
+Run: python3 sft_stream.py FILE.sft     (prints one line per tab)
+"""
+import base64
+import codecs
+import json
+import re
+import sys
+import zlib
+
+CHUNK = 1 << 16                  # characters of base64 read per step
+_NOT_B64 = re.compile(r'[^A-Za-z0-9+/=]')      # b64decode drops these too
+_WS = ' \t\r\n'
+
+
+def _payload(path, size=CHUNK):
+    """Yield the payload line's base64 text (version char stripped) in chunks:
+    the first non-blank, non-'#' line, read at most `size` chars at a time."""
+    with open(path, encoding='utf-8') as f:
+        while True:
+            line = f.readline(size)
+            if not line:
+                raise ValueError(f"{path}: no .sft payload line")
+            if line.startswith('#'):
+                while line and not line.endswith('\n'):   # over-long comment
+                    line = f.readline(size)
+            elif line.strip():
+                break
+        line = line[1:] or f.readline(size)
+        while line:
+            yield line
+            if line.endswith('\n'):
+                return
+            line = f.readline(size)
+
+
+def _inflated(path):
+    """Yield the decompressed JSON text in chunks."""
+    z = zlib.decompressobj()
+    text = codecs.getincrementaldecoder('utf-8')()
+    carry = ''
+    for chunk in _payload(path):
+        chunk = carry + _NOT_B64.sub('', chunk)
+        cut = len(chunk) - len(chunk) % 4
+        carry = chunk[cut:]
+        if cut:
+            yield text.decode(z.decompress(base64.b64decode(chunk[:cut])))
+    if carry:
+        yield text.decode(z.decompress(base64.b64decode(carry)))
+    yield text.decode(z.flush(), final=True)
+
+
+class _JsonStream:
+    """Minimal pull parser over a stream of text chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self.buf, self.pos, self.eof = '', 0, False
+        self._dec = json.JSONDecoder()
+
+    def _more(self):
+        for chunk in self._chunks:
+            if chunk:
+                self.buf = self.buf[self.pos:] + chunk
+                self.pos = 0
+                return True
+        self.eof = True
+        return False
+
+    def peek(self):
+        """Next non-whitespace character ('' at end of input)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._more():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, chars):
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f".sft json: expected {chars!r}, got {c!r}")
+        self.pos += 1
+        return c
+
+    def value(self):
+        """Decode the next complete JSON value, pulling chunks as needed."""
+        self.peek()
+        while True:
+            try:
+                obj, end = self._dec.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._more():
+                    continue
+                raise
+            if end == len(self.buf) and not self.eof and self._more():
+                continue                          # a number may go on
+            self.pos = end
+            return obj
+
+
+def iter_tabs(path):
+    """Yield each tab dict of the .sft export at `path`, in file order."""
+    js = _JsonStream(_inflated(path))
+    js.expect('{')
+    if js.peek() == '}':
+        return
+    while True:
+        key = js.value()
+        js.expect(':')
+        if key != 'tabs':
+            js.value()
+        else:
+            js.expect('[')
+            if js.peek() == ']':
+                return
+            while True:
+                yield js.value()
+                if js.expect(',]') == ']':
+                    return
+        if js.expect(',}') == '}':
+            return
+
+
+if __name__ == '__main__':
+    for i, tab in enumerate(iter_tabs(sys.argv[1])):
+        req = tab.get('request', {})
+        print(f"tab {i} {tab.get('metadata', {}).get('name')!r}: "
+              f"{len(req.get('production', []))} targets, "
+              f"{len(req.get('input', []))} inputs")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+shard_knapsack.py — exact power-shard allocation for building-count savings.
+
+Overclocking the N-1 (or N-2, ...) buildings of a fractional step saves one
+(two, ...) buildings per copy at a shard cost. With a fixed shard budget
+this is a multiple-choice 0/1 knapsack: each step is a GROUP of mutually
+exclusive options (save 1 building, save 2, ...), each with an integer shard
+cost and a value (building footprint saved). solve() is the exact DP —
+O(options x budget), a few thousand cells for a 200-shard budget — and
+greedy() is the historical rule (largest building first, then fewest
+shards, single-building saves only), kept to report the optimality gap.
+
+Options are dicts carrying at least 'total_shards' and 'footprint_saved';
+both selectors return the chosen option dicts. Shared by compute_modules
+and build_factory_crazy.
+"""
+
+MAX_SAVED = 2          # buildings saved per step copy the options may offer
+
+
+def value(picks):
+    return sum(o["footprint_saved"] for o in picks)
+
+
+def cost(picks):
+    return sum(o["total_shards"] for o in picks)
+
+
+def greedy(groups, budget, key):
+    """Take each group's single-save option in `key` order while it fits."""
+    singles = sorted((g[0] for g in groups if g), key=key)
+    picks, used = [], 0
+    for o in singles:
+        if used + o["total_shards"] <= budget:
+            used += o["total_shards"]
+            picks.append(o)
+    return picks
+
+
+def solve(groups, budget):
+    """At most one option per group, total shards <= budget, maximising
+    footprint saved, then minimising shards. Picks come back in group order."""
+    # best[b] = (value, -shards) using the groups so far within b shards
+    best = [(0, 0)] * (budget + 1)
+    choice = []                                  # per group: b -> option idx
+    for g in groups:
+        nxt, took = list(best), [-1] * (budget + 1)
+        for k, o in enumerate(g):
+            c = o["total_shards"]
+            for b in range(c, budget + 1):
+                v, neg = best[b - c]
+                cand = (v + o["footprint_saved"], neg - c)
+                if cand > nxt[b]:
+                    nxt[b], took[b] = cand, k
+        best = nxt
+        choice.append(took)
+    picks, b = [], budget
+    for g, took in zip(reversed(groups), reversed(choice)):
+        k = took[b]
+        if k >= 0:
+            picks.append(g[k])
+            b -= g[k]["total_shards"]
+    return picks[::-1]
+
+
+def gap_report(label, optimal, baseline, budget):
+    """One line comparing the exact pick with greedy (footprint saved)."""
+    v, g = value(optimal), value(baseline)
+    gap = (v - g) / v * 100 if v else 0.0
+    return (f"{label}: exact saves {v} footprint with {cost(optimal)}/{budget} "
+            f"shards; greedy {g} with {cost(baseline)} "
+            f"(greedy optimality gap {gap:.1f}%)")